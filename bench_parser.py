@@ -0,0 +1,129 @@
+"""
+详情表格解析基准测试：先校验 lxml 后端与 BeautifulSoup 后端输出逐条一致，再对比吞吐量。
+
+语料:
+  - 默认使用内置生成的样例详情页 (覆盖 tbody/th 表头、列错位、重复行、嵌套标签、&nbsp;、注释、脚本等情况)
+  - 传入 --cache 路径时，额外读取 DetailCache 中缓存的真实详情页
+
+用法: python bench_parser.py [--cache cache/detail_cache.sqlite3] [--rounds 3] [--processes 4]
+"""
+import argparse
+import random
+import sqlite3
+import sys
+import time
+import zlib
+
+from spider.parse_pool import ParsePool
+from spider.table_parser import parse_html_table_bs4, parse_html_table_lxml
+
+HEADER = ["序号", "采购项目名称", "采购需求概况", "预算金额(万元)", "拟面向中小企业预留", "预计采购时间", "备注"]
+
+
+def _cell(text, rnd):
+    style = rnd.randint(0, 6)
+    if style == 0:
+        return f"<td><p><span>{text}</span></p></td>"
+    if style == 1:
+        return f"<td>\n\t{text}&nbsp; <br/>  </td>"
+    if style == 2:
+        return f"<td><!-- 注释 -->{text}<script>var x = 1;</script></td>"
+    if style == 3:
+        half = len(text) // 2
+        return f"<td><span>{text[:half]}</span>\n<span>{text[half:]}</span></td>"
+    return f"<td>{text}</td>"
+
+
+def make_page(seed):
+    rnd = random.Random(seed)
+    parts = ["<html><head><meta charset='utf-8'></head><body><p>采购意向公开</p>"]
+    # 说明性表格 (无表头，应被跳过)
+    parts.append("<table><tr><td>采购单位</td><td>某某局</td></tr><tr><td>联系人</td><td>张三</td></tr></table>")
+
+    for t in range(rnd.randint(1, 2)):
+        use_th = rnd.random() < 0.3
+        use_tbody = rnd.random() < 0.6
+        rows = []
+        cell_tag = "th" if use_th else "td"
+        rows.append("<tr>" + "".join(f"<{cell_tag}>{h}</{cell_tag}>" for h in HEADER) + "</tr>")
+        for i in range(rnd.randint(1, 30)):
+            name = f"项目{seed}-{t}-{rnd.randint(1, 25)} 采购"
+            values = [
+                str(i + 1), name, "需求概况：" + "采购设备若干，" * rnd.randint(1, 5),
+                f"{rnd.randint(1, 9999) / 10:.1f}", rnd.choice(["是", "否"]),
+                f"2025年{rnd.randint(1, 12)}月", rnd.choice(["", "无", "资金已落实"])
+            ]
+            if rnd.random() < 0.08:
+                # 序号列缺失导致整行左移
+                values = values[1:]
+            rows.append("<tr>" + "".join(_cell(v, rnd) for v in values) + "</tr>")
+        body = "".join(rows)
+        if use_tbody:
+            body = f"<tbody>{body}</tbody>"
+        parts.append(f"<table border='1'>{body}</table>")
+    parts.append("</body></html>")
+    return "".join(parts)
+
+
+def load_cache_corpus(path):
+    conn = sqlite3.connect(path)
+    try:
+        return [zlib.decompress(row[0]).decode("utf-8") for row in conn.execute("SELECT html FROM detail_cache")]
+    finally:
+        conn.close()
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--cache", default="", help="DetailCache 数据库路径 (可选)")
+    ap.add_argument("--pages", type=int, default=500, help="生成的样例详情页数量")
+    ap.add_argument("--rounds", type=int, default=3)
+    ap.add_argument("--processes", type=int, default=0, help="额外测试解析进程池 (0 = 不测)")
+    args = ap.parse_args()
+
+    corpus = [make_page(i) for i in range(args.pages)]
+    if args.cache:
+        cached = load_cache_corpus(args.cache)
+        print(f"读取缓存详情页 {len(cached)} 个")
+        corpus.extend(cached)
+
+    # 1. 等价性校验
+    mismatches = 0
+    rows = 0
+    for idx, html in enumerate(corpus):
+        expected = parse_html_table_bs4(html)
+        actual = parse_html_table_lxml(html)
+        rows += len(expected)
+        if expected != actual:
+            mismatches += 1
+            if mismatches <= 3:
+                print(f"❌ 第 {idx} 个页面输出不一致\n  bs4 : {expected[:2]}\n  lxml: {actual[:2]}")
+    print(f"等价性校验: {len(corpus)} 个页面, {rows} 行, 不一致 {mismatches} 个")
+    if mismatches:
+        sys.exit(1)
+
+    # 2. 吞吐量
+    for name, parse in [("bs4", parse_html_table_bs4), ("lxml", parse_html_table_lxml)]:
+        best = None
+        for _ in range(args.rounds):
+            t0 = time.perf_counter()
+            for html in corpus:
+                parse(html)
+            cost = time.perf_counter() - t0
+            best = cost if best is None else min(best, cost)
+        print(f"{name:<5} {len(corpus) / best:8.1f} 页/秒 ({best:.3f}s / {len(corpus)} 页)")
+
+    # 3. 进程池 (批量重解析场景)
+    if args.processes:
+        for name in ("bs4", "lxml"):
+            pool = ParsePool(name, args.processes)
+            pool.map(corpus[:args.processes])  # 预热子进程
+            t0 = time.perf_counter()
+            pool.map(corpus)
+            cost = time.perf_counter() - t0
+            pool.close()
+            print(f"{name:<5} x{args.processes} 进程 {len(corpus) / cost:8.1f} 页/秒 ({cost:.3f}s)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,173 @@
+"""
+WebDriver 往返次数基准：对比逐元素查询 (旧实现) 与页面内批量脚本 (dom_scripts) 的每页 HTTP 往返次数和耗时。
+
+通过包装 driver.execute 计数 —— WebElement 的 .text / get_attribute / is_displayed / click 等最终都经过它。
+使用本地生成的列表页样例 (结构与 ccgp-shandong 列表页一致：时间快捷按钮、日期控件、数据表、分页、验证码)，
+不访问真实网站。
+
+用法: python bench_roundtrips.py [--rows 10] [--divs 2000]
+"""
+import argparse
+import os
+import tempfile
+import time
+
+from selenium import webdriver
+from selenium.webdriver.chrome.service import Service as ChromeService
+from selenium.webdriver.common.by import By
+
+from spider import dom_scripts
+from spider.browser_engine import resolve_driver_path
+
+
+def make_page(rows, divs):
+    parts = ["<html><head><meta charset='utf-8'></head><body><div class='second-search'>"]
+    for text in ["今日", "近7天", "近30天", "近半年", "近一年", "近三年"]:
+        parts.append(f"<div class='item'>{text}</div>")
+    parts.append("<input placeholder='请输入公告标题'>")
+    parts.append("<div class='n-captcha'><img src='blob:http://x/0000-1111' width='80' height='30'>"
+                 "<i class='refresh-icon'>刷新</i></div><input placeholder='请输入验证码'>")
+    parts.append("<button><span>重置</span></button><button><span>查询</span></button></div>")
+    # 隐藏的日期控件与其他布局 div
+    parts.append("<table class='el-date-table' style='display:none'><tbody>")
+    parts.append("".join("<tr class='el-date-table__row'><td>1</td></tr>" for _ in range(6)))
+    parts.append("</tbody></table>")
+    parts.append("".join(f"<div class='cell'>{i}</div>" for i in range(divs)))
+    parts.append("<table><tbody>")
+    for i in range(rows):
+        parts.append(f"<tr><td>{i + 1}</td><td>山东省本级</td><td><span>某某单位 2025 年采购意向 {i}</span></td>"
+                     f"<td>公开招标</td><td>货物</td><td>2025-06-0{i % 9 + 1}</td></tr>")
+    parts.append("</tbody></table>")
+    parts.append("<div class='el-pagination'><button class='btn-next'>下一页</button>"
+                 "<span class='el-pagination__editor'><input value='1'></span></div>")
+    parts.append("</body></html>")
+    return "".join(parts)
+
+
+class RoundTripCounter(object):
+    def __init__(self, driver):
+        self.count = 0
+        original = driver.execute
+
+        def execute(command, params=None):
+            self.count += 1
+            return original(command, params)
+        driver.execute = execute
+
+    def measure(self, func):
+        start = self.count
+        t0 = time.perf_counter()
+        func()
+        return self.count - start, time.perf_counter() - t0
+
+
+# ---- 旧实现：逐元素查询 ----
+
+def legacy_rows(driver):
+    # extract_records 的列表部分：先扫描一次，之后每处理一行都重新取行列表 (防 Stale) 再读该行单元格
+    all_rows = driver.find_elements(By.CSS_SELECTOR, "table:not(.el-date-table) tbody tr")
+    all_rows = [r for r in all_rows if "el-date-table__row" not in (r.get_attribute("class") or "")]
+    visible = [r for r in all_rows if r.is_displayed()]
+    for i in range(len(visible)):
+        current = [r for r in driver.find_elements(By.CSS_SELECTOR, "table tbody tr") if r.is_displayed()]
+        cols = current[i].find_elements(By.TAG_NAME, "td")
+        [c.text.strip() for c in cols[1:6]]
+        cols[2].find_element(By.TAG_NAME, "span")
+
+
+def legacy_quick_time(driver, text="近30天"):
+    for div in driver.find_elements(By.TAG_NAME, "div"):
+        if "item" in (div.get_attribute("class") or "") and div.text.strip() == text:
+            return div
+
+
+def legacy_search_button(driver):
+    for btn in driver.find_elements(By.TAG_NAME, "button"):
+        if btn.text and "查询" in btn.text:
+            return btn
+
+
+def legacy_captcha(driver):
+    imgs = driver.find_elements(By.CSS_SELECTOR, "div.n-captcha img")
+    for inp in driver.find_elements(By.TAG_NAME, "input"):
+        ph = inp.get_attribute("placeholder")
+        label = inp.get_attribute("aria-label")
+        if (ph and "验证码" in ph) or (label and "验证码" in label):
+            break
+    if imgs and imgs[0].is_displayed():
+        imgs[0].get_attribute("src")
+
+
+def legacy_pagination(driver):
+    btn = driver.find_element(By.CSS_SELECTOR, "button.btn-next")
+    btn.get_attribute("class")
+    btn.get_attribute("disabled")
+    btn.is_enabled()
+
+
+# ---- 新实现：一次脚本调用 ----
+
+def batched_rows(driver):
+    rows = [r for r in driver.execute_script(dom_scripts.LIST_ROWS) if r["visible"]]
+    for i in range(len(rows)):
+        driver.execute_script(dom_scripts.LIST_ROWS)[i]["cells"]
+
+
+def batched_quick_time(driver, text="近30天"):
+    return driver.execute_script(dom_scripts.QUICK_TIME_BUTTON, text)
+
+
+def batched_search_button(driver):
+    return driver.execute_script(dom_scripts.BUTTON_BY_TEXT, "查询")
+
+
+def batched_captcha(driver):
+    return driver.execute_script(dom_scripts.CAPTCHA)
+
+
+def batched_pagination(driver):
+    return driver.execute_script(dom_scripts.PAGINATION)
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--rows", type=int, default=10, help="每页数据行数")
+    ap.add_argument("--divs", type=int, default=2000, help="页面中其他 div 数量")
+    args = ap.parse_args()
+
+    fd, path = tempfile.mkstemp(suffix=".html")
+    with os.fdopen(fd, "w", encoding="utf-8") as f:
+        f.write(make_page(args.rows, args.divs))
+
+    options = webdriver.ChromeOptions()
+    options.add_argument("--headless")
+    options.add_argument("--no-sandbox")
+    driver = webdriver.Chrome(service=ChromeService(resolve_driver_path()), options=options)
+    try:
+        driver.get("file://" + path)
+        counter = RoundTripCounter(driver)
+        ops = [
+            ("列表行提取", legacy_rows, batched_rows),
+            ("时间快捷按钮", legacy_quick_time, batched_quick_time),
+            ("查询按钮", legacy_search_button, batched_search_button),
+            ("验证码状态", legacy_captcha, batched_captcha),
+            ("分页状态", legacy_pagination, batched_pagination),
+        ]
+        results = {}
+        print(f"{'操作':<10}{'旧: 往返':>10}{'旧: 耗时':>10}{'新: 往返':>10}{'新: 耗时':>10}")
+        for name, legacy, batched in ops:
+            old_n, old_t = counter.measure(lambda: legacy(driver))
+            new_n, new_t = counter.measure(lambda: batched(driver))
+            results[name] = (old_n, new_n)
+            print(f"{name:<10}{old_n:>10}{old_t:>9.2f}s{new_n:>10}{new_t:>9.2f}s")
+
+        # 翻一页 = 列表行提取 + 分页状态 + 验证码检测 (不含逐行点击进详情)
+        per_page = [sum(results[k][j] for k in ("列表行提取", "分页状态", "验证码状态")) for j in (0, 1)]
+        print(f"\n每页 ({args.rows} 行，不含逐行点击): 旧 {per_page[0]} 次往返 -> 新 {per_page[1]} 次往返")
+    finally:
+        driver.quit()
+        os.remove(path)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+"""
+连接池基准测试：对比 "每次 requests.get" 与 "Shandong 复用 Session" 的单请求耗时。
+在本地起一个模拟 getDetail 接口的 HTTP/1.1 服务，按 500 个详情页、2 线程并发计时。
+
+用法: python bench_session.py [详情数] [并发数]
+"""
+import base64
+import json
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import requests
+
+from spider.shandong import Shandong
+
+DETAIL_BODY = base64.b64encode(
+    "<table><tr><td>序号</td><td>采购项目名称</td></tr><tr><td>1</td><td>测试项目</td></tr></table>".encode("utf-8")
+).decode("ascii")
+PAYLOAD = json.dumps({"data": {"data": {"body": DETAIL_BODY}}}).encode("utf-8")
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # 支持 keep-alive
+    disable_nagle_algorithm = True  # 避免响应头/体分包触发延迟确认
+
+    def do_GET(self):
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(PAYLOAD)))
+        self.end_headers()
+        self.wfile.write(PAYLOAD)
+
+    def log_message(self, *args):
+        pass
+
+
+def run_batch(fetch, url, total, workers):
+    latencies = []
+    lock = threading.Lock()
+
+    def one(i):
+        t0 = time.perf_counter()
+        resp = fetch(url, params={"id": i, "colCode": "2500", "oldData": 0}, timeout=20)
+        resp.json()
+        cost = time.perf_counter() - t0
+        with lock:
+            latencies.append(cost)
+
+    t0 = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        list(executor.map(one, range(total)))
+    wall = time.perf_counter() - t0
+    latencies.sort()
+    return wall, sum(latencies) / len(latencies), latencies[int(len(latencies) * 0.95) - 1]
+
+
+def main():
+    total = int(sys.argv[1]) if len(sys.argv) > 1 else 500
+    workers = int(sys.argv[2]) if len(sys.argv) > 2 else 2
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StubHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    url = f"http://127.0.0.1:{server.server_port}/api/website/site/getDetail"
+
+    spider = Shandong(detail_workers=workers)
+    # 本地桩服务不需要伪造 host 头
+    spider.session.headers.pop("host", None)
+
+    def fresh_get(url, **kwargs):
+        headers = spider.get_headers()
+        headers.pop("host", None)
+        return requests.get(url, headers=headers, **kwargs)
+
+    print(f"详情数: {total}, 并发: {workers}")
+    for name, fetch in [("requests.get (无连接池)", fresh_get), ("Shandong.session (连接池)", spider.session.get)]:
+        wall, avg, p95 = run_batch(fetch, url, total, workers)
+        print(f"{name:<28} 总耗时 {wall:.3f}s | 平均 {avg * 1000:.2f}ms | P95 {p95 * 1000:.2f}ms")
+
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
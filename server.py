@@ -1,23 +1,107 @@
-from fastapi import FastAPI, BackgroundTasks
+from fastapi import FastAPI, BackgroundTasks, HTTPException, Request
 from fastapi.staticfiles import StaticFiles
-from fastapi.responses import FileResponse
+from fastapi.responses import FileResponse, StreamingResponse
 from pydantic import BaseModel
+from typing import List, Optional
+import asyncio
+import json
 import os
+import time
 import uuid
 from spider.shandong import Shandong
-import pandas as pd
+from spider.detail_cache import DetailCache
+from spider.watermark import WatermarkStore
+from spider.exporter import open_sink
+from spider.browser_pool import BrowserPool
+from spider.ocr_service import get_ocr_service
+from spider.waits import PolitenessScheduler
+from spider.multi_region import MultiRegionJob, REGIONS
+from spider.shards import ShardedCrawl, plan_shards
+from spider.shandong import resolve_time_range
+from spider.parse_pool import ParsePool
+from spider.checkpoint import PageCheckpoint
+from spider.dedup_index import DedupIndex
+from spider.search_store import SearchStore
+from spider.rate_control import AimdController
+from task_log import TaskLog
+from task_store import TaskStore
 
 app = FastAPI()
 
-# Make sure static directory exists
-if not os.path.exists("static"):
-    os.makedirs("static")
+# Mount static files (目录在 startup 钩子中创建)
+app.mount("/ui", StaticFiles(directory="static", check_dir=False), name="static")
 
-# Mount static files
-app.mount("/ui", StaticFiles(directory="static"), name="static")
+# 共享的存储 / 浏览器池都在 startup 钩子中创建，导入本模块不能有副作用：
+# Windows 上进程池以 spawn 方式启动子进程，会重新导入主模块，
+# 否则每个解析子进程都会重建各存储，并把正在运行的任务标记为 interrupted
+task_store = None        # 任务登记表 (SQLite WAL)，服务重启后仍可查询历史任务与下载结果
+detail_cache = None      # 详情页本地缓存，所有任务共享 (重复爬取相同公告时直接读盘)
+watermark_store = None   # 增量爬取水位线 (按 地区 + 栏目)
+dedup_index = None       # 跨任务去重索引 (公告 + 子行指纹)，支持"只导出新内容"
+search_store = None      # 本地检索库：爬到的行全部入库 (FTS5 + 地区/日期/预算索引)
+browser_pool = None      # 浏览器池：最多同时开 2 个 Chrome，任务排队租用，每个浏览器处理 200 页后重启
+parse_pool = None        # 详情表格解析进程池，所有任务共享 (子进程只启动一次)
 
-# Store task status and logs
-tasks = {}
+# 按主机的礼貌延迟，所有任务共享同一预算
+politeness = PolitenessScheduler()
+
+# 按页断点目录 (每个任务一个子目录)
+CHECKPOINT_DIR = os.path.join("cache", "checkpoints")
+
+# 运行中任务的日志环形缓冲 (TaskLog)，调试日志按比例采样；定期增量落库，任务结束后移出内存
+live_logs = {}
+MAX_LOG_LINES = 1000
+FLUSH_INTERVAL = 2.0
+_flush_state = {}  # task_id -> (已落库的日志序号, 上次落库时间)
+
+def append_log(task_id, msg):
+    log = live_logs.get(task_id)
+    if log is None:
+        return None
+    return log.append(msg)
+
+def flush_task(task_id, progress=None, force=False):
+    """把新日志与进度计数写入任务库 (默认最多每 FLUSH_INTERVAL 秒一次)"""
+    flushed_seq, last_flush = _flush_state.get(task_id, (0, 0.0))
+    now = time.time()
+    if not force and now - last_flush < FLUSH_INTERVAL:
+        return
+    _flush_state[task_id] = (flushed_seq, now)
+    log = live_logs.get(task_id)
+    if log is not None:
+        events = log.since(flushed_seq)
+        task_store.append_logs(task_id, events)
+        if events:
+            _flush_state[task_id] = (events[-1]["seq"], now)
+    if progress is not None:
+        task_store.update(task_id, progress=progress)
+
+def task_logs_since(task_id, since):
+    log = live_logs.get(task_id)
+    if log is not None:
+        return log.since(since)
+    return task_store.logs(task_id, since, MAX_LOG_LINES)
+
+@app.on_event("startup")
+def open_stores():
+    global task_store, detail_cache, watermark_store, dedup_index, search_store, browser_pool, parse_pool
+    if not os.path.exists("static"):
+        os.makedirs("static")
+    task_store = TaskStore("cache/tasks.sqlite3")
+    # 上次进程退出时仍在运行的任务已无法继续，标记为 interrupted (有断点的可通过 /api/resume 续爬)
+    task_store.mark_interrupted()
+    detail_cache = DetailCache("cache/detail_cache.sqlite3")
+    watermark_store = WatermarkStore("cache/crawl_state.sqlite3")
+    dedup_index = DedupIndex("cache/dedup_index.sqlite3")
+    search_store = SearchStore("cache/search.sqlite3")
+    browser_pool = BrowserPool(max_size=2, max_pages=200, headless=False)
+    parse_pool = ParsePool("lxml")
+
+@app.on_event("shutdown")
+def close_browser_pool():
+    browser_pool.close()
+    parse_pool.close()
+    search_store.flush()
 
 class CrawlRequest(BaseModel):
     area: str = "370000"
@@ -27,6 +111,16 @@ class CrawlRequest(BaseModel):
     maxPages: int = 1
     title: str = ""
     useProxy: bool = False
+    useCache: bool = True
+    incremental: bool = False
+    engine: str = "browser"  # browser / network / api
+    exportFormat: str = "xlsx"  # xlsx / csv / jsonl
+    areas: List[str] = []  # 多个地区并行爬取；area 为 "all" 时取全省
+    regionWorkers: int = 3  # 多地区任务最多同时爬取的地区数
+    shard: bool = False  # 按日期分片并行爬取 (接口直连，单地区)
+    shardWorkers: int = 3  # 最多同时爬取的分片数
+    shardMaxPages: int = 20  # 单个分片的页数上限，超过则拆分为更短的时间窗口
+    newOnly: bool = False  # 只导出以前任务没有导出过的公告 / 子行 (跨任务去重索引)
 
 @app.get("/")
 async def read_index():
@@ -35,94 +129,287 @@ async def read_index():
 @app.post("/api/crawl")
 async def start_crawl(req: CrawlRequest, background_tasks: BackgroundTasks):
     task_id = str(uuid.uuid4())
-    tasks[task_id] = {"status": "running", "file": None, "logs": []}
+    live_logs[task_id] = TaskLog(MAX_LOG_LINES)
+    task_store.create(task_id, req.model_dump())
     
     background_tasks.add_task(run_spider_task, task_id, req)
     return {"task_id": task_id}
 
+@app.post("/api/resume/{task_id}")
+async def resume_crawl(task_id: str, background_tasks: BackgroundTasks):
+    """
+    从断点续爬失败 / 中断的任务：以新任务 id 运行，先回放已完成页的数据，再从最后完成页的下一页继续。
+    断点目录随之移交给新任务，新任务再次中断时仍可续爬。
+    """
+    task = task_store.get(task_id)
+    if task is None:
+        return {"status": "not_found"}
+    if task["status"] not in ("failed", "interrupted"):
+        return {"status": task["status"], "error": "只能续爬失败或中断的任务"}
+    checkpoint_path = os.path.join(CHECKPOINT_DIR, task_id)
+    if not os.path.exists(os.path.join(checkpoint_path, "manifest.json")):
+        return {"status": task["status"], "error": "该任务没有已完成页的断点"}
+    
+    req = CrawlRequest(**task["params"])
+    new_id = str(uuid.uuid4())
+    os.replace(checkpoint_path, os.path.join(CHECKPOINT_DIR, new_id))
+    task_store.update(task_id, status="resumed")
+    live_logs[new_id] = TaskLog(MAX_LOG_LINES)
+    task_store.create(new_id, dict(req.model_dump(), resumeFrom=task_id))
+    
+    background_tasks.add_task(run_spider_task, new_id, req)
+    return {"task_id": new_id, "resume_from": task_id}
+
 @app.get("/api/status/{task_id}")
-async def get_status(task_id: str):
-    return tasks.get(task_id, {"status": "not_found"})
+async def get_status(task_id: str, since: Optional[int] = None):
+    task = task_store.get(task_id)
+    if task is None:
+        return {"status": "not_found"}
+    entries = task_logs_since(task_id, since or 0)
+    result = {
+        "status": task["status"],
+        "file": task["file"],
+        "error": task["error"],
+        "progress": task["progress"],
+        "seq": entries[-1]["seq"] if entries else (since or 0)
+    }
+    if since is None:
+        result["logs"] = [e["msg"] for e in entries]
+        result["params"] = task["params"]
+        log = live_logs.get(task_id)
+        if log is not None:
+            result["log_stats"] = log.stats()
+    else:
+        # 增量模式：只返回 since 之后的新日志事件
+        result["logs"] = entries
+    return result
+
+@app.get("/api/tasks")
+async def list_tasks(limit: int = 50):
+    """历史任务列表 (含重启前的任务)"""
+    return task_store.list(limit)
+
+@app.get("/api/browsers")
+async def browser_status():
+    """浏览器池状态：在用 / 空闲 / 排队任务数"""
+    return browser_pool.summary()
+
+@app.get("/api/ocr")
+async def ocr_status():
+    """验证码识别服务统计：识别耗时、批大小、通过率"""
+    return get_ocr_service().summary()
+
+@app.get("/api/search")
+async def search_intentions(q: str = "", area: str = "", region: str = "", startDate: str = "", endDate: str = "",
+                            minBudget: Optional[float] = None, maxBudget: Optional[float] = None,
+                            limit: int = 20, cursor: str = ""):
+    """
+    查询本地检索库：q 为空格分隔的关键词 (匹配 标题 / 采购项目名称 / 采购需求概况)，
+    area 为地区代码，region 为地区名称，预算单位为万元；翻页时传回上一页的 next_cursor。
+    """
+    try:
+        return search_store.search(q, area=area, region=region, start_date=startDate, end_date=endDate,
+                                   min_budget=minBudget, max_budget=maxBudget, limit=limit, cursor=cursor)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+@app.get("/api/aggregates")
+async def budget_aggregates(groupBy: str = "region,month,project_type", region: str = "", projectType: str = "",
+                            startMonth: str = "", endMonth: str = ""):
+    """
+    预算汇总 (万元)，来自入库时增量维护的预聚合表：groupBy 为 region / month (发布月份) / project_type 的逗号组合，
+    月份格式 YYYY-MM。
+    """
+    return search_store.aggregates([d.strip() for d in groupBy.split(",") if d.strip()], region=region,
+                                   project_type=projectType, start_month=startMonth, end_month=endMonth)
+
+@app.get("/api/dedup")
+async def dedup_status():
+    """去重索引统计：已登记键数、布隆过滤器直接排除 / 查库次数"""
+    return dedup_index.stats()
+
+@app.get("/api/events/{task_id}")
+async def task_events(task_id: str, request: Request, since: int = 0):
+    """
+    SSE 推送：event: log 为新日志 (id 为序号)，event: status 为状态变化。
+    断线重连时浏览器自动带上 Last-Event-ID，从断点继续推送。
+    """
+    last_event_id = request.headers.get("last-event-id")
+    if last_event_id and last_event_id.isdigit():
+        since = int(last_event_id)
+
+    async def event_stream():
+        cursor = since
+        last_status = None
+        idle = 0.0
+        while True:
+            task = task_store.get(task_id)
+            if task is None:
+                yield f"event: status\ndata: {json.dumps({'status': 'not_found'})}\n\n"
+                return
+            # 先读状态再推日志：状态变为终态前写入的日志一定会在状态事件之前送达
+            status = task["status"]
+            sent = False
+            for entry in task_logs_since(task_id, cursor):
+                cursor = entry["seq"]
+                yield f"id: {cursor}\nevent: log\ndata: {json.dumps(entry, ensure_ascii=False)}\n\n"
+                sent = True
+            if status != last_status:
+                last_status = status
+                payload = {"status": last_status, "file": task["file"], "seq": cursor}
+                yield f"event: status\ndata: {json.dumps(payload, ensure_ascii=False)}\n\n"
+                sent = True
+                if last_status != "running":
+                    return
+            if await request.is_disconnected():
+                return
+            idle = 0.0 if sent else idle + 0.5
+            if idle >= 15:
+                # 心跳，防止代理断开空闲连接
+                yield ": ping\n\n"
+                idle = 0.0
+            await asyncio.sleep(0.5)
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
 
 @app.get("/api/download/{task_id}")
 async def download_file(task_id: str):
-    task = tasks.get(task_id)
-    if task and task["status"] == "completed" and task["file"]:
-        return FileResponse(task["file"], filename="shandong_data.xlsx")
+    task = task_store.get(task_id)
+    if task and task["status"] == "completed" and task["file"] and os.path.exists(task["file"]):
+        ext = os.path.splitext(task["file"])[1]
+        return FileResponse(task["file"], filename=f"shandong_data{ext}")
     return {"error": "File not ready"}
 
-import io
-import sys
-from contextlib import redirect_stdout
-
 def run_spider_task(task_id: str, req: CrawlRequest):
     # Setup custom logging inside the function
     def log_callback(msg):
-        print(msg) # Still print to terminal
-        if task_id in tasks:
-            tasks[task_id]["logs"].append(msg)
-            # Keep log size manageable
-            if len(tasks[task_id]["logs"]) > 1000:
-                tasks[task_id]["logs"].pop(0)
+        # 被采样丢弃的调试日志也不再打印，避免长任务刷屏
+        if append_log(task_id, msg) is not None:
+            print(msg) # Still print to terminal
+        if job is not None:
+            flush_task(task_id, current_progress())
 
-    try:
-        spider = Shandong(use_proxy=req.useProxy)
-        spider.log_func = log_callback
-        
-        data = spider.run(
-            max_pages=req.maxPages, 
-            start_page=req.startPage,
-            title=req.title, 
-            start_time=req.startTime, 
-            end_time=req.endTime, 
-            area=req.area
+    def current_progress():
+        return dict(job.progress) if isinstance(job, Shandong) else job.summary()
+
+    def new_spider(**kwargs):
+        return Shandong(
+            use_proxy=req.useProxy,
+            detail_cache=detail_cache if req.useCache else None,
+            watermark_store=watermark_store,
+            browser_pool=browser_pool,
+            politeness=politeness,
+            dedup_index=dedup_index,
+            new_only=req.newOnly,
+            search_store=search_store,
+            parse_pool=parse_pool,
+            **kwargs
         )
+
+    job = None
+    checkpoint = None
+    crawl_kwargs = dict(
+        max_pages=req.maxPages,
+        start_page=req.startPage,
+        title=req.title,
+        start_time=req.startTime,
+        end_time=req.endTime,
+        incremental=req.incremental,
+        engine=req.engine
+    )
+
+    try:
+        # 边爬边写盘，导出不再需要在内存中保留全部数据
+        sink = open_sink(req.exportFormat, os.path.join("static", f"shandong_data_{task_id}"))
+        try:
+            regions = list(REGIONS) if req.area == "all" else req.areas
+            if len(regions) > 1:
+                # 多地区并行：各地区共享礼貌延迟调度器和详情限速器 (解析进程池本就全局共享)，
+                # 并行多少个地区，对同一主机的总请求速率都不变
+                rate_controller = AimdController(concurrency=2, max_concurrency=8)
+                job = MultiRegionJob(
+                    lambda: new_spider(rate_controller=rate_controller),
+                    regions, sink, workers=req.regionWorkers, log_func=log_callback
+                )
+                job.run(**crawl_kwargs)
+            else:
+                area = regions[0] if regions else req.area
+                start_time, end_time = resolve_time_range(req.startTime, req.endTime)
+                if req.shard and not (start_time and end_time):
+                    log_callback("日期分片需要明确的时间范围，本次按普通方式爬取")
+                if req.shard and start_time and end_time:
+                    # 日期分片：先用一个爬虫过验证码并探测各时间窗口的页数，再并行爬取各分片
+                    job = new_spider()
+                    job.log_func = log_callback
+                    job.bootstrap_api_session(req.title, req.startTime, req.endTime, area)
+                    shards = plan_shards(
+                        start_time, end_time,
+                        lambda start, end: job.probe_list(req.title, start, end, area),
+                        max_pages=req.shardMaxPages
+                    )
+                    if req.incremental:
+                        log_callback("日期分片模式不使用增量水位线，本次按全量爬取")
+                    rate_controller = AimdController(concurrency=2, max_concurrency=8)
+                    job = ShardedCrawl(
+                        lambda: new_spider(rate_controller=rate_controller),
+                        shards, sink, workers=req.shardWorkers, session_source=job, log_func=log_callback
+                    )
+                    job.run(title=req.title, area=area)
+                else:
+                    job = new_spider()
+                    job.log_func = log_callback
+                    # 每完成一页落盘断点；已有断点 (续爬) 时先回放已完成页，再从下一页继续
+                    checkpoint = PageCheckpoint(os.path.join(CHECKPOINT_DIR, task_id))
+                    if checkpoint.last_page is not None:
+                        for page in checkpoint.iter_pages():
+                            sink.write_rows(page["rows"])
+                        last_page = req.startPage + req.maxPages - 1
+                        crawl_kwargs["start_page"] = checkpoint.last_page + 1
+                        crawl_kwargs["max_pages"] = last_page - checkpoint.last_page
+                        log_callback(f"从断点续爬: 已回放 {len(checkpoint.pages)} 页 ({checkpoint.row_count} 行)，"
+                                     f"从第 {crawl_kwargs['start_page']} 页继续")
+                    if crawl_kwargs["max_pages"] > 0:
+                        job.run(area=area, sink=sink, checkpoint=checkpoint, **crawl_kwargs)
+        finally:
+            sink.close()
         
-        if data:
-            df = pd.DataFrame(data)
-            # Define new column order
-            cols = [
-                "序号", 
-                "地区", 
-                "标题",
-                "发布人",  # 新增发布人列
-                "采购方式", 
-                "项目类型", 
-                "发布时间",
-                "子序号",
-                "采购项目名称",
-                "采购需求概况",
-                "预算金额(万元)",
-                "拟面向中小企业预留",
-                "预计采购时间",
-                "备注",
-                "Link" 
-            ]
-            
-            # Ensure all columns exist
-            for col in cols:
-                if col not in df.columns:
-                    df[col] = ""
-            
-            # Reorder
-            df = df[cols]
-            
-            filename = f"shandong_data_{task_id}.xlsx"
-            filepath = os.path.join("static", filename)
-            df.to_excel(filepath, index=False)
-            
-            tasks[task_id]["status"] = "completed"
-            tasks[task_id]["file"] = filepath
-            spider._log(f"任务完成! 数据已保存到 {filepath}")
+        # 先写日志并落库再改状态，保证客户端看到终态时已收到全部日志
+        # 单地区、多地区、日期分片任务都通过 last_error 报告中断
+        error = getattr(job, "last_error", None)
+        if not sink.row_count:
+            os.remove(sink.path)
+        if error:
+            # 运行中断 (浏览器崩溃等)：已写出的部分数据照常可下载，断点保留供续爬
+            if checkpoint and checkpoint.last_page is not None:
+                log_callback(f"任务中断: {error}。已完成的 {len(checkpoint.pages)} 页已保存断点，"
+                             f"可通过 /api/resume/{task_id} 从第 {checkpoint.last_page + 1} 页续爬")
+            else:
+                log_callback(f"任务中断: {error}")
+            flush_task(task_id, current_progress(), force=True)
+            task_store.update(task_id, status="failed", error=error, file=sink.path if sink.row_count else None)
+        elif sink.row_count:
+            log_callback(f"任务完成! 共 {sink.row_count} 行，数据已保存到 {sink.path}")
+            flush_task(task_id, current_progress(), force=True)
+            task_store.update(task_id, status="completed", file=sink.path)
         else:
-            tasks[task_id]["status"] = "completed"
-            spider._log("任务完成，但未抓取到任何数据。")
+            log_callback("任务完成，但未抓取到任何数据。")
+            flush_task(task_id, current_progress(), force=True)
+            task_store.update(task_id, status="completed")
+        if checkpoint and (not error or checkpoint.last_page is None):
+            checkpoint.remove()
             
     except Exception as e:
         print(f"Task failed: {e}")
-        tasks[task_id]["status"] = "failed"
-        if task_id in tasks:
-            tasks[task_id]["logs"].append(f"Error: {str(e)}")
+        append_log(task_id, f"Error: {str(e)}")
+        flush_task(task_id, current_progress() if job else None, force=True)
+        task_store.update(task_id, status="failed", error=str(e))
+    finally:
+        live_logs.pop(task_id, None)
+        _flush_state.pop(task_id, None)
 
 if __name__ == "__main__":
     import uvicorn
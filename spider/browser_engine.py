@@ -1,24 +1,80 @@
 import time
 import os
+import json
+import base64
 import logging
+import threading
+import requests
 from selenium import webdriver
+from selenium.common.exceptions import SessionNotCreatedException, NoSuchElementException, TimeoutException
 from selenium.webdriver.chrome.service import Service as ChromeService
 from selenium.webdriver.common.by import By
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
 from webdriver_manager.chrome import ChromeDriverManager
-import ddddocr
-from PIL import Image
-import io
+from spider.ocr_service import get_ocr_service
+from spider import dom_scripts
+from spider.waits import PolitenessScheduler, WaitReport, host_of
+from spider.storage import ensure_parent_dir
 import re
-import random
+
+# 已解析的 chromedriver 路径缓存 (进程内 + 磁盘)，避免每次启动都走 ChromeDriverManager 联网检查
+DRIVER_PATH_FILE = "cache/chromedriver.json"
+_driver_path = None
+_driver_path_lock = threading.Lock()
+
+
+def resolve_driver_path(refresh=False):
+    """返回 chromedriver 路径：优先用缓存，refresh=True 或缓存失效时重新下载/解析"""
+    global _driver_path
+    with _driver_path_lock:
+        if not refresh:
+            if _driver_path and os.path.exists(_driver_path):
+                return _driver_path
+            try:
+                with open(DRIVER_PATH_FILE, encoding="utf-8") as f:
+                    path = json.load(f).get("path")
+                if path and os.path.exists(path):
+                    _driver_path = path
+                    return path
+            except (OSError, ValueError):
+                pass
+        path = ChromeDriverManager().install()
+        _driver_path = path
+        ensure_parent_dir(DRIVER_PATH_FILE)
+        with open(DRIVER_PATH_FILE, "w", encoding="utf-8") as f:
+            json.dump({"path": path, "resolved_at": time.time()}, f)
+        return path
+
+
+SEARCH_URL = "http://www.ccgp-shandong.gov.cn/xxgk"
+
 
 class BrowserEngine:
-    def __init__(self, headless=True):
+    def __init__(self, headless=True, user_data_dir=None, probe="async", network_capture=False):
+        """
+        user_data_dir: 持久化的 Chrome 用户数据目录 (Cookies / 缓存跨次启动保留)，None = 临时目录
+        probe: 网络连通性检测方式 "async" = 后台线程检测不阻塞启动; "sync" = 启动时同步检测; "off" = 不检测
+        network_capture: 开启性能日志中的 Network 事件，可直接读取页面自身发出的列表接口响应
+        """
         self.headless = headless
+        self.user_data_dir = user_data_dir
+        self.probe = probe
+        self.network_capture = network_capture
+        self.capture_keyword = "getListByCode"
+        self._captured_requests = {}  # requestId -> 请求体 (postData)
         self.driver = None
-        self.ocr = ddddocr.DdddOcr(show_ad=False)
+        # 启动各阶段耗时 (秒)
+        self.timings = {}
+        # 共享的验证码识别服务，模型在进程内只加载一次
+        self.ocr = get_ocr_service()
         self.logger = None
+        # 累计处理的列表页数，浏览器池据此定期回收
+        self.pages_served = 0
+        # 礼貌延迟调度器与等待统计，租用浏览器的任务会替换成自己的
+        self.politeness = PolitenessScheduler()
+        self.wait_report = WaitReport()
+        self.site_host = host_of(SEARCH_URL)
 
     def _log(self, msg):
         if self.logger:
@@ -42,9 +98,34 @@ class BrowserEngine:
         options.add_experimental_option("excludeSwitches", ["enable-automation"])
         options.add_experimental_option('useAutomationExtension', False)
 
+        if self.user_data_dir:
+            profile = os.path.abspath(self.user_data_dir)
+            if not os.path.exists(profile):
+                os.makedirs(profile)
+            options.add_argument(f"--user-data-dir={profile}")
+        # DOM 就绪即返回，不等图片等资源；需要的元素由显式等待保证
+        options.page_load_strategy = "eager"
+        if self.network_capture:
+            options.set_capability("goog:loggingPrefs", {"performance": "ALL"})
+            options.add_experimental_option("perfLoggingPrefs", {"enableNetwork": True, "enablePage": False})
+
         self._log("正在启动 Chrome 浏览器...")
-        service = ChromeService(ChromeDriverManager().install())
-        self.driver = webdriver.Chrome(service=service, options=options)
+        t_start = time.perf_counter()
+        self.timings = {}
+        
+        t0 = time.perf_counter()
+        driver_path = resolve_driver_path()
+        self.timings["driver_path"] = time.perf_counter() - t0
+        
+        t0 = time.perf_counter()
+        try:
+            self.driver = webdriver.Chrome(service=ChromeService(driver_path), options=options)
+        except SessionNotCreatedException as e:
+            # 缓存的驱动与已升级的 Chrome 版本不匹配，重新解析一次
+            self._log(f"缓存的 chromedriver 不可用，重新获取: {e.msg}")
+            driver_path = resolve_driver_path(refresh=True)
+            self.driver = webdriver.Chrome(service=ChromeService(driver_path), options=options)
+        self.timings["launch"] = time.perf_counter() - t0
         
         self.driver.execute_cdp_cmd("Page.addScriptToEvaluateOnNewDocument", {
             "source": """
@@ -54,12 +135,22 @@ class BrowserEngine:
             """
         })
         self.driver.implicitly_wait(5)
-        self._log("浏览器启动成功")
+        self.driver.set_page_load_timeout(15)
         
         # 网络连接测试
+        if self.probe == "sync":
+            t0 = time.perf_counter()
+            self._probe_network()
+            self.timings["probe"] = time.perf_counter() - t0
+        elif self.probe == "async":
+            threading.Thread(target=self._probe_network, daemon=True).start()
+        
+        self.timings["total"] = time.perf_counter() - t_start
+        self._log("浏览器启动成功，耗时: " + " / ".join(f"{k} {v:.2f}s" for k, v in self.timings.items()))
+
+    def _probe_network(self):
         try:
-            self.driver.set_page_load_timeout(15)
-            self.driver.get("https://www.baidu.com")
+            requests.head("https://www.baidu.com", timeout=10)
             self._log("网络连接正常")
         except Exception as net_err:
             self._log(f"⚠️ 网络连接测试失败: {net_err}")
@@ -70,6 +161,154 @@ class BrowserEngine:
             self.driver.quit()
             self.driver = None
 
+    def is_alive(self):
+        """健康检查：driver 已启动且仍能响应命令"""
+        if not self.driver:
+            return False
+        try:
+            self.driver.window_handles
+            return True
+        except Exception:
+            return False
+
+    def reset(self):
+        """归还浏览器池前清理现场：关闭多余标签页，回到主窗口"""
+        try:
+            handles = self.driver.window_handles
+            for handle in handles[1:]:
+                self.driver.switch_to.window(handle)
+                self.driver.close()
+            self.driver.switch_to.window(handles[0])
+            if self.network_capture:
+                # 丢弃未读取的网络事件，避免在 chromedriver 中堆积
+                self.drain_captured_responses()
+            return True
+        except Exception:
+            return False
+
+    def drain_captured_responses(self):
+        """
+        读取性能日志中已完成的列表接口请求，返回 [(请求参数 dict, 响应文本)]，按完成顺序排列。
+        需要 network_capture=True。
+        """
+        results = []
+        for entry in self.driver.get_log("performance"):
+            try:
+                message = json.loads(entry["message"])["message"]
+            except (ValueError, KeyError):
+                continue
+            method = message.get("method")
+            params = message.get("params", {})
+            request_id = params.get("requestId")
+            if method == "Network.requestWillBeSent":
+                request = params.get("request", {})
+                if self.capture_keyword in request.get("url", ""):
+                    self._captured_requests[request_id] = request.get("postData") or ""
+            elif method == "Network.loadingFailed":
+                self._captured_requests.pop(request_id, None)
+            elif method == "Network.loadingFinished" and request_id in self._captured_requests:
+                post_data = self._captured_requests.pop(request_id)
+                try:
+                    body = self.driver.execute_cdp_cmd("Network.getResponseBody", {"requestId": request_id})
+                except Exception as e:
+                    self._log(f"读取列表接口响应失败: {e}")
+                    continue
+                text = body.get("body", "")
+                if body.get("base64Encoded"):
+                    text = base64.b64decode(text).decode("utf-8", errors="replace")
+                try:
+                    request_params = json.loads(post_data) if post_data else {}
+                except ValueError:
+                    request_params = {}
+                results.append((request_params, text))
+        return results
+
+    def wait_list_response(self, timeout=15, settle=0.5):
+        """
+        等待页面发出的列表接口响应。一次操作可能触发多个请求 (如切换筛选条件)，
+        收到响应后再等 settle 秒没有新响应才返回最后一个；超时返回 None。
+        """
+        t0 = time.time()
+        deadline = t0 + timeout
+        latest = None
+        latest_at = 0.0
+        try:
+            while True:
+                captured = self.drain_captured_responses()
+                now = time.time()
+                if captured:
+                    latest = captured[-1]
+                    latest_at = now
+                if latest and now - latest_at >= settle:
+                    return latest
+                if now >= deadline:
+                    return latest
+                time.sleep(0.1)
+        finally:
+            self.wait_report.add("page", time.time() - t0)
+
+    def get_cookies(self):
+        """导出当前浏览器 Cookies，供 requests Session 复用 (API 模式)"""
+        try:
+            return self.driver.get_cookies()
+        except Exception as e:
+            self._log(f"读取 Cookies 失败: {e}")
+            return []
+
+    def get_user_agent(self):
+        try:
+            return self.driver.execute_script("return navigator.userAgent")
+        except Exception as e:
+            self._log(f"读取 User-Agent 失败: {e}")
+            return ""
+
+    def polite(self):
+        """会触发站点请求的操作 (点击查询 / 翻页 / 打开详情) 之前调用，统一走按主机的礼貌延迟"""
+        self.politeness.wait(self.site_host, self.wait_report)
+
+    def wait_for(self, condition, timeout=10, desc=""):
+        """显式等待页面条件成立 (代替固定 sleep)，返回条件的值，超时返回 None；耗时计入页面等待"""
+        t0 = time.perf_counter()
+        try:
+            return WebDriverWait(self.driver, timeout, poll_frequency=0.2).until(condition)
+        except TimeoutException:
+            if desc:
+                self._log(f"等待{desc}超时 ({timeout}s)")
+            return None
+        finally:
+            self.wait_report.add("page", time.perf_counter() - t0)
+
+    def list_signature(self):
+        return self.driver.execute_script(dom_scripts.LIST_STATE)["sig"]
+
+    def wait_list_update(self, before_sig, timeout=10, desc="列表刷新"):
+        """等待列表刷新完成 (签名变化且加载遮罩消失) 或出现验证码错误提示，返回列表状态，超时返回 None"""
+        def updated(driver):
+            state = driver.execute_script(dom_scripts.LIST_STATE)
+            if state["captcha_error"] or (not state["loading"] and state["sig"] != before_sig):
+                return state
+            return False
+        return self.wait_for(updated, timeout, desc)
+
+    def wait_list_idle(self, timeout=5):
+        """等待加载遮罩消失 (筛选条件切换后列表可能不变，只能等遮罩)"""
+        return self.wait_for(lambda d: not d.execute_script(dom_scripts.LIST_STATE)["loading"], timeout, "列表加载")
+
+    def _xpath_state(self, xpath):
+        """一次脚本调用取元素、激活状态和文本；找不到时与 find_element 一样抛出异常"""
+        state = self.driver.execute_script(dom_scripts.XPATH_STATE, xpath)
+        if state is None:
+            raise NoSuchElementException(f"未找到元素: {xpath}")
+        return state
+
+    def refresh_captcha(self, state=None):
+        """点击验证码刷新按钮，并等待图片 src 变化 (新图片已加载)"""
+        state = state or self.driver.execute_script(dom_scripts.CAPTCHA)
+        old_src = state["src"]
+        self.polite()
+        state["refresh"].click()
+        self.wait_for(lambda d: d.execute_script(dom_scripts.CAPTCHA)["src"] != old_src, 5, "验证码图片刷新")
+
     def solve_captcha(self, refresh_first=True):
         """
         检测并自动识别只有在出现验证码时才调用的逻辑
@@ -80,46 +319,35 @@ class BrowserEngine:
             # 图片: div.n-captcha > img
             # 输入框: input[placeholder="请输入验证码"]
             
-            # 使用更宽泛的查找以免 DOM 微调失效
-            captcha_imgs = self.driver.find_elements(By.CSS_SELECTOR, "div.n-captcha img")
-            input_box = None
-            inputs = self.driver.find_elements(By.TAG_NAME, "input")
-            for inp in inputs:
-                ph = inp.get_attribute("placeholder")
-                label = inp.get_attribute("aria-label")
-                if (ph and "验证码" in ph) or (label and "验证码" in label):
-                    input_box = inp
-                    break
+            # 使用更宽泛的查找以免 DOM 微调失效 (一次脚本调用取回图片、刷新按钮、输入框)
+            state = self.driver.execute_script(dom_scripts.CAPTCHA)
+            input_box = state["input"]
             
-            if captcha_imgs and input_box:
-                img_el = captcha_imgs[0]
-                if img_el.is_displayed():
+            if state["img"] and input_box:
+                img_el = state["img"]
+                if state["visible"]:
                     # 1. 点击刷新 (根据用户要求)
                     if refresh_first:
                         try:
-                            refresh_btn = self.driver.find_element(By.CSS_SELECTOR, "div.n-captcha i.refresh-icon")
-                            refresh_btn.click()
+                            self.refresh_captcha(state)
                             self._log("点击了验证码刷新按钮")
-                            time.sleep(random.uniform(1, 2)) # 等待新图片加载
                         except Exception as e:
                             self._log(f"刷新验证码失败: {e}")
 
-                    src = img_el.get_attribute("src")
+                    src = img_el.get_attribute("src") if refresh_first else state["src"]
                     if src and "blob:" in src and len(src) > 10:
                         self._log("检测到验证码，准备识别...")
                         
-                        # 截图
+                        # 截图 (PNG 字节直接交给识别服务)
                         screenshot = img_el.screenshot_as_png
-                        img = Image.open(io.BytesIO(screenshot))
                         
                         # 识别
-                        res = self.ocr.classification(img)
+                        res = self.ocr.classify(screenshot)
                         self._log(f"OCR 识别结果: {res}")
                         
                         # 填入
                         input_box.clear()
                         input_box.send_keys(res)
-                        time.sleep(random.uniform(1, 2))
                         return True
             return False
         except Exception as e:
@@ -128,15 +356,16 @@ class BrowserEngine:
         return False
 
     def goto_search_page(self):
-        url = "http://www.ccgp-shandong.gov.cn/xxgk"
+        url = SEARCH_URL
         self._log(f"访问页面: {url}")
+        self.polite()
+        t0 = time.perf_counter()
         self.driver.get(url)
         # 等待加载
-        try:
-            WebDriverWait(self.driver, 15).until(
-                EC.presence_of_element_located((By.CSS_SELECTOR, "div.second-search"))
-            )
-        except:
+        if self.wait_for(EC.presence_of_element_located((By.CSS_SELECTOR, "div.second-search")), 15):
+            self.timings["search_page"] = time.perf_counter() - t0
+            self._log(f"搜索页加载完成，耗时 {self.timings['search_page']:.2f}s")
+        else:
             self._log("页面加载超时，可能网络慢或结构变更")
 
     def perform_search(self, title="", start_time="", end_time="", area="370000"):
@@ -153,14 +382,14 @@ class BrowserEngine:
             self._log("尝试切换到 '意向公开' Tab...")
             # 使用用户提供的精确 XPath
             tab_xpath = "/html/body/div[1]/div[1]/div/div/div[1]/div/ul/li[1]"
-            tab_el = self.driver.find_element(By.XPATH, tab_xpath)
+            tab = self._xpath_state(tab_xpath)
             
             # 检查是否已激活
-            class_attr = tab_el.get_attribute("class") or ""
-            if "is_active" not in class_attr:
-                tab_el.click()
+            if not tab["active"]:
+                self.polite()
+                tab["el"].click()
                 self._log("点击了 '意向公开' Tab")
-                time.sleep(random.uniform(1, 2))
+                self.wait_list_idle()
             else:
                 self._log("'意向公开' Tab 已经是激活状态")
         except Exception as e:
@@ -195,27 +424,30 @@ class BrowserEngine:
             if area == "370000":
                 # 山东省本级 - 直接点击
                 xpath = "/html/body/div[1]/div[1]/div/div/div[2]/div/div[2]/div[1]/div[1]/div[1]"
-                el = self.driver.find_element(By.XPATH, xpath)
-                if "is_active" not in (el.get_attribute("class") or ""):
-                    el.click()
+                el = self._xpath_state(xpath)
+                if not el["active"]:
+                    self.polite()
+                    el["el"].click()
                     self._log("选择了: 山东省本级")
-                    time.sleep(random.uniform(1, 2))
+                    self.wait_list_idle()
             elif area in city_xpath_index:
+                idx = city_xpath_index[area]
+                city_xpath = f"/html/body/div[1]/div[1]/div/div/div[2]/div/div[2]/div[1]/div[2]/div[1]/div[3]/div[2]/div[{idx}]"
                 # 先点击"市区县"tab
                 tab_xpath = "/html/body/div[1]/div[1]/div/div/div[2]/div/div[2]/div[1]/div[1]/div[2]"
-                tab_el = self.driver.find_element(By.XPATH, tab_xpath)
-                if "is_active" not in (tab_el.get_attribute("class") or ""):
-                    tab_el.click()
+                tab = self._xpath_state(tab_xpath)
+                if not tab["active"]:
+                    tab["el"].click()
                     self._log("点击了: 市区县 Tab")
-                    time.sleep(random.uniform(1, 2))
+                    # 只切换城市面板，不请求列表，等城市选项出现即可
+                    self.wait_for(lambda d: d.execute_script(dom_scripts.XPATH_STATE, city_xpath), 5, "城市选项")
                 
                 # 再点击具体城市
-                idx = city_xpath_index[area]
-                city_xpath = f"/html/body/div[1]/div[1]/div/div/div[2]/div/div[2]/div[1]/div[2]/div[1]/div[3]/div[2]/div[{idx}]"
-                city_el = self.driver.find_element(By.XPATH, city_xpath)
-                city_el.click()
-                self._log(f"选择了城市: {city_el.text.strip()}")
-                time.sleep(random.uniform(1, 2))
+                city = self._xpath_state(city_xpath)
+                self.polite()
+                city["el"].click()
+                self._log(f"选择了城市: {city['text']}")
+                self.wait_list_idle()
             else:
                 self._log(f"未知的地区代码: {area}，跳过地区选择")
         except Exception as e:
@@ -225,14 +457,10 @@ class BrowserEngine:
         if title:
             try:
                 # input[placeholder="请输入公告标题"]
-                # 遍历 input 找 placeholder
-                inputs = self.driver.find_elements(By.TAG_NAME, "input")
-                for inp in inputs:
-                    ph = inp.get_attribute("placeholder")
-                    if ph and "公告标题" in ph:
-                        inp.clear()
-                        inp.send_keys(title)
-                        break
+                inp = self.driver.execute_script(dom_scripts.INPUT_BY_PLACEHOLDER, "公告标题")
+                if inp:
+                    inp.clear()
+                    inp.send_keys(title)
             except Exception as e:
                 self._log(f"标题输入出错: {e}")
 
@@ -253,25 +481,16 @@ class BrowserEngine:
         if quick_btn_text:
             try:
                 self._log(f"尝试点击时间范围: {quick_btn_text}")
-                # 查找时间范围按钮列表 - 通过文本内容查找所有 div
-                all_divs = self.driver.find_elements(By.TAG_NAME, "div")
-                clicked = False
-                for div in all_divs:
-                    try:
-                        div_text = div.text.strip()
-                        div_class = div.get_attribute("class") or ""
-                        # 必须是 .item 类的 div，且文本完全匹配
-                        if "item" in div_class and div_text == quick_btn_text:
-                            if "is_active" not in div_class:
-                                div.click()
-                                self._log(f"点击了时间范围按钮: {quick_btn_text}")
-                                time.sleep(random.uniform(1, 2))
-                            else:
-                                self._log(f"时间范围按钮 '{quick_btn_text}' 已激活")
-                            clicked = True
-                            break
-                    except:
-                        continue
+                # 必须是 .item 类的 div，且文本完全匹配 (页面内一次查找，不再逐个 div 取文本)
+                btn = self.driver.execute_script(dom_scripts.QUICK_TIME_BUTTON, quick_btn_text)
+                clicked = btn is not None
+                if btn and not btn["active"]:
+                    self.polite()
+                    btn["el"].click()
+                    self._log(f"点击了时间范围按钮: {quick_btn_text}")
+                    self.wait_list_idle()
+                elif btn:
+                    self._log(f"时间范围按钮 '{quick_btn_text}' 已激活")
                 
                 if not clicked:
                     self._log(f"未找到时间范围按钮: {quick_btn_text}")
@@ -291,10 +510,8 @@ class BrowserEngine:
                 # 用户强调步骤：参数设置完 -> 点击刷新 -> 识别 -> 填入 -> 点击查询
                 # 我们显式触发刷新按钮点击，确保拿到最新验证码
                 try:
-                    refresh_btn = self.driver.find_element(By.CSS_SELECTOR, "div.n-captcha i.refresh-icon")
-                    refresh_btn.click()
+                    self.refresh_captcha()
                     self._log("强制刷新验证码...")
-                    time.sleep(random.uniform(1, 2)) 
                 except:
                     pass
 
@@ -313,30 +530,28 @@ class BrowserEngine:
 
 
                 # b. 点击查询
-                buttons = self.driver.find_elements(By.TAG_NAME, "button")
-                search_btn = None
-                for btn in buttons:
-                    if btn.text and "查询" in btn.text:
-                        search_btn = btn
-                        break
+                search_btn = self.driver.execute_script(dom_scripts.BUTTON_BY_TEXT, "查询")
                 
                 if search_btn:
+                    before = self.list_signature()
+                    self.polite()
                     search_btn.click()
                     self._log("点击了查询按钮")
-                    time.sleep(random.uniform(1, 2))
                     
                     # c. 检查是否出现“验证码错误”提示
-                    # 检查页面 body 文本是否包含关键词，或者特定 element
-                    # 这里简单检查 body text
-                    page_source = self.driver.page_source
-                    if "验证码错误" in page_source:
+                    # 等列表刷新或出现错误提示；结果与查询前相同时等到超时再检查一次
+                    state = self.wait_list_update(before, timeout=3) or self.driver.execute_script(dom_scripts.LIST_STATE)
+                    if state["captcha_error"]:
                          self._log("检测到 '验证码错误' 提示，准备重试...")
-                         time.sleep(random.uniform(1, 2))
+                         if has_captcha:
+                             self.ocr.report(False)
                          continue
                     
                     # d. 检查是否成功加载数据 (可选)
                     # 如果没有错误提示，且没有抛异常，我们假定成功
                     self._log("查询操作完成，未检测到错误提示。")
+                    if has_captcha:
+                        self.ocr.report(True)
                     break
                 else:
                     self._log("未找到查询按钮，无法执行搜索")
@@ -351,35 +566,27 @@ class BrowserEngine:
         提取当前页列表数据，并点击获取详情页 URL ID
         """
         records = []
+        self.pages_served += 1
         try:
             # 1. 精确查找有效数据行（无需等待重试，找不到直接返回空，由上层rescue逻辑处理）
-            all_rows = self.driver.find_elements(By.CSS_SELECTOR, "table:not(.el-date-table) tbody tr")
-            
-            # 二次过滤：排除含有 el-date-table__row 类的行
-            all_rows = [r for r in all_rows if "el-date-table__row" not in (r.get_attribute("class") or "")]
-            visible_rows = [r for r in all_rows if r.is_displayed()]
+            # 一次脚本调用取回所有行的可见性、单元格文本和点击目标 (已排除日期控件的行)
+            all_rows = self.driver.execute_script(dom_scripts.LIST_ROWS)
+            visible_rows = [r for r in all_rows if r["visible"]]
             
             self._log(f"当前页发现 {len(all_rows)} 行，其中可见行 {len(visible_rows)} 行")
             
+            force_all = False
             if len(all_rows) > 0 and len(visible_rows) == 0:
                 self._log("⚠️ 警告：检测到有数据行但判定为不可见，正在分析原因...")
                 for idx, r in enumerate(all_rows[:3]): # 只分析前3行
-                    try:
-                        className = r.get_attribute("class")
-                        style = r.get_attribute("style")
-                        innerText = r.get_attribute("innerText")
-                        self._log(f"Row {idx} Debug: Class='{className}', Style='{style}', Text='{innerText[:50]}...'")
-                        # 检查父级
-                        parent = r.find_element(By.XPATH, "./..") # tbody
-                        p_style = parent.get_attribute("style")
-                        p_class = parent.get_attribute("class")
-                        self._log(f"Parent (TBODY) Debug: Class='{p_class}', Style='{p_style}'")
-                    except Exception as e:
-                        self._log(f"分析行 {idx} 失败: {e}")
+                    innerText = " ".join(r["cells"])
+                    self._log(f"Row {idx} Debug: Class='{r['cls']}', Style='{r['style']}', Text='{innerText[:50]}...'")
+                    self._log(f"Parent (TBODY) Debug: Class='{r['parent_cls']}', Style='{r['parent_style']}'")
                 
                 # 尝试强制使用 all_rows，看看是否能死马当活马医
                 self._log("尝试强制处理所有行（忽略可见性检查）...")
                 visible_rows = all_rows
+                force_all = True
             
             # 保存主窗口句柄
             main_handle = self.driver.current_window_handle
@@ -394,8 +601,8 @@ class BrowserEngine:
             for i in range(row_count):
                 try:
                     # 重新获取行列表，防止 Stale
-                    current_rows = self.driver.find_elements(By.CSS_SELECTOR, "table tbody tr")
-                    visible_current_rows = [r for r in current_rows if r.is_displayed()]
+                    current_rows = self.driver.execute_script(dom_scripts.LIST_ROWS)
+                    visible_current_rows = current_rows if force_all else [r for r in current_rows if r["visible"]]
                     
                     if i >= len(visible_current_rows):
                         break
@@ -403,65 +610,46 @@ class BrowserEngine:
                     row = visible_current_rows[i]
                     
                     # 提取基础数据
-                    cols = row.find_elements(By.TAG_NAME, "td")
+                    cols = row["cells"]
                     if len(cols) < 3: continue
                     
-                    area_name = cols[1].text.strip()
-                    title = cols[2].text.strip()
-                    buy_mode = cols[3].text.strip()
-                    prj_type = cols[4].text.strip()
-                    pub_date = cols[5].text.strip()
+                    area_name = cols[1]
+                    title = cols[2]
+                    buy_mode = cols[3]
+                    prj_type = cols[4]
+                    pub_date = cols[5]
                     
-                    # 点击标题
-                    # 尝试定位标题元素
-                    try:
-                        click_target = cols[2].find_element(By.TAG_NAME, "span")
-                    except:
-                        click_target = cols[2] # 降级点击 td
+                    # 点击标题 (优先点标题 span，没有则点 td)
+                    click_target = row["target"]
                     
-                    self.driver.execute_script("arguments[0].scrollIntoView({behavior: 'smooth', block: 'center'});", click_target)
-                    time.sleep(random.uniform(1, 2))
+                    self.driver.execute_script("arguments[0].scrollIntoView({block: 'center'});", click_target)
                     
                     # 记录点击前的状态
                     old_handles = self.driver.window_handles
                     old_url = self.driver.current_url
                     
-                    # 执行点击
+                    # 执行点击 (打开详情页会请求站点，先走礼貌延迟)
+                    self.polite()
                     try:
                         click_target.click()
                     except:
                         self.driver.execute_script("arguments[0].click();", click_target)
                     
-                    # 等待反应
-                    time.sleep(random.uniform(1, 2))
+                    # 等待反应：新标签页打开或当前页跳转
+                    self.wait_for(lambda d: len(d.window_handles) > len(old_handles) or d.current_url != old_url, 5)
                     
                     new_handles = self.driver.window_handles
                     new_url = self.driver.current_url
                     detail_url = ""
-                    publisher = ""  # 初始化发布人
                     
                     if len(new_handles) > len(old_handles):
                         # 新标签页打开了
                         new_handle = [h for h in new_handles if h not in old_handles][0]
                         self.driver.switch_to.window(new_handle)
-                        self._log("已打开详情页 Tab，模拟浏览停留...")
-                        time.sleep(random.uniform(1, 2))
+                        # 只需要详情页 URL 中的 id；发布人等头部信息改由 getDetail 响应提供，无需等待页面渲染
+                        self.wait_for(lambda d: "id=" in d.current_url, 5, "详情页 URL")
                         detail_url = self.driver.current_url
                         
-                        # 提取发布人
-                        publisher = ""
-                        try:
-                            publisher_xpath = "/html/body/div/div[1]/div/div/div[1]/div[2]/span[2]"
-                            publisher_el = self.driver.find_element(By.XPATH, publisher_xpath)
-                            publisher_raw = publisher_el.text.strip()
-                            # 去掉"发布人："前缀
-                            if "发布人：" in publisher_raw:
-                                publisher = publisher_raw.replace("发布人：", "").strip()
-                            else:
-                                publisher = publisher_raw
-                        except Exception as e:
-                            self._log(f"提取发布人失败: {e}")
-                        
                         self.driver.close()
                         self.driver.switch_to.window(main_handle)
                     elif new_url != old_url:
@@ -507,7 +695,7 @@ class BrowserEngine:
                                 "projectType": prj_type,
                                 "date": pub_date,
                                 "url": detail_url,
-                                "publisher": publisher  # 发布人
+                                "publisher": ""  # 由 getDetail 响应补齐
                             }
                             records.append(rec)
                             self._log(f"成功提取: {title}")
@@ -529,30 +717,34 @@ class BrowserEngine:
         """点击下一页，并处理可能出现的验证码"""
         try:
             # li.btn-next/ button.btn-next
-            next_btn = self.driver.find_element(By.CSS_SELECTOR, "button.btn-next")
-            btn_class = next_btn.get_attribute("class") or ""
-            btn_disabled = next_btn.get_attribute("disabled")
+            state = self.driver.execute_script(dom_scripts.PAGINATION)
+            next_btn = state["next"]
+            if next_btn is None:
+                raise NoSuchElementException("未找到下一页按钮")
+            btn_class = state["next_class"]
+            btn_disabled = state["next_disabled"]
             
-            self._log(f"下一页按钮状态: class='{btn_class}', disabled='{btn_disabled}', is_enabled={next_btn.is_enabled()}")
+            self._log(f"下一页按钮状态: class='{btn_class}', disabled='{btn_disabled}', is_enabled={state['next_enabled']}")
             
             # Element UI disabled button has property or class
-            if next_btn.is_enabled() and "disabled" not in btn_class:
+            if state["next_enabled"] and "disabled" not in btn_class:
+                before = self.list_signature()
+                self.polite()
                 next_btn.click()
                 self._log("已点击下一页按钮")
-                time.sleep(random.uniform(2, 3)) # 等待加载
+                self.wait_list_update(before, desc="翻页")
                 
                 # 翻页后可能需要验证码！检测并处理
                 has_captcha = self.solve_captcha(refresh_first=True)
                 if has_captcha:
                     self._log("翻页后检测到验证码，已自动处理")
                     # 点击查询按钮
-                    buttons = self.driver.find_elements(By.TAG_NAME, "button")
-                    for btn in buttons:
-                        if btn.text and "查询" in btn.text:
-                            btn.click()
-                            self._log("点击了查询按钮")
-                            time.sleep(random.uniform(1, 2))
-                            break
+                    btn = self.driver.execute_script(dom_scripts.BUTTON_BY_TEXT, "查询")
+                    if btn:
+                        self.polite()
+                        btn.click()
+                        self._log("点击了查询按钮")
+                        self.wait_list_idle()
                 
                 return True
             else:
@@ -562,11 +754,18 @@ class BrowserEngine:
             self._log(f"翻页失败: {e}")
             return False
 
+    def at_last_page(self):
+        """下一页按钮存在但不可用，即已在最后一页 (翻页失败时区分"翻到底"与"出错")"""
+        try:
+            state = self.driver.execute_script(dom_scripts.PAGINATION)
+            return state["next"] is not None and not (state["next_enabled"] and "disabled" not in state["next_class"])
+        except Exception:
+            return False
+
     def get_current_page(self):
         """获取当前页码"""
         try:
-            inp = self.driver.find_element(By.CSS_SELECTOR, ".el-pagination__editor input")
-            val = inp.get_attribute("value")
+            val = self.driver.execute_script(dom_scripts.PAGINATION)["page"]
             if val and val.isdigit():
                 return int(val)
         except:
@@ -590,16 +789,16 @@ class BrowserEngine:
             inp.click()
             inp.send_keys(Keys.CONTROL + "a")
             inp.send_keys(Keys.DELETE)
-            time.sleep(random.uniform(0.5, 1.5))
             
             # 输入目标页码
             inp.send_keys(str(page_num))
-            time.sleep(random.uniform(0.5, 1.5))
             
             # 回车触发跳转
+            before = self.list_signature()
+            self.polite()
             inp.send_keys(Keys.ENTER)
             self._log(f"已输入页码 {page_num} 并按下回车")
-            time.sleep(random.uniform(2, 3))
+            self.wait_list_update(before, desc="跳页")
             
             # 验证跳转结果
             new_val = inp.get_attribute("value")
@@ -610,13 +809,12 @@ class BrowserEngine:
             if has_captcha:
                 self._log("跳转页面后检测到验证码，已自动处理")
                 # 点击查询按钮
-                buttons = self.driver.find_elements(By.TAG_NAME, "button")
-                for btn in buttons:
-                    if btn.text and "查询" in btn.text:
-                        btn.click()
-                        self._log("点击了查询按钮")
-                        time.sleep(random.uniform(2, 3))
-                        break
+                btn = self.driver.execute_script(dom_scripts.BUTTON_BY_TEXT, "查询")
+                if btn:
+                    self.polite()
+                    btn.click()
+                    self._log("点击了查询按钮")
+                    self.wait_list_idle()
             
             return True
         except Exception as e:
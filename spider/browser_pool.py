@@ -0,0 +1,177 @@
+import collections
+import contextlib
+import os
+import threading
+import time
+
+from spider.waits import WaitReport
+
+
+class BrowserPool(object):
+    """
+    浏览器池：限制同时存在的 Chrome 数量，任务按 FIFO 排队租用，空闲浏览器跨任务复用。
+    - max_size: 最多同时存在的浏览器数 (含正在使用和空闲的)
+    - max_pages: 单个浏览器累计处理页数达到后回收重建，避免长时间运行内存膨胀
+    - idle_timeout: 空闲超过该秒数的浏览器被关闭
+    - 租出前和归还时做健康检查，driver 已失效的直接丢弃
+    - profile_dir: 每个名额固定一个 Chrome 用户数据目录 (profile_dir/0, /1 ...)，重建后 Cookies / 缓存仍在
+    - network_capture: 浏览器开启网络抓包，供 engine="network" 直接读取列表接口响应
+    """
+
+    def __init__(self, max_size=2, max_pages=200, idle_timeout=600, headless=False, factory=None,
+                 profile_dir="cache/chrome_profile", probe="async", network_capture=True):
+        self.max_size = max_size
+        self.max_pages = max_pages
+        self.idle_timeout = idle_timeout
+        self.headless = headless
+        self.factory = factory
+        self.profile_dir = profile_dir
+        self.probe = probe
+        self.network_capture = network_capture
+        # 空闲的用户数据目录编号；同一目录不能同时被两个 Chrome 使用
+        self.free_slots = list(range(max_size))
+        self.cond = threading.Condition()
+        self.idle = []  # [(browser, 归还时间)]，末尾为最近归还的
+        self.size = 0
+        self.waiters = collections.deque()
+        self.closed = False
+        self.stats = collections.Counter()
+
+    def _create(self, slot):
+        if self.factory:
+            browser = self.factory()
+        else:
+            from spider.browser_engine import BrowserEngine
+            user_data_dir = os.path.join(self.profile_dir, str(slot)) if self.profile_dir else None
+            browser = BrowserEngine(headless=self.headless, user_data_dir=user_data_dir, probe=self.probe,
+                                    network_capture=self.network_capture)
+        browser.profile_slot = slot
+        return browser
+
+    def _discard(self, browser):
+        try:
+            browser.close()
+        except Exception:
+            pass
+
+    def _reap_idle(self):
+        """取出空闲超时的浏览器 (需持有锁)，由调用方在锁外关闭"""
+        now = time.time()
+        expired = [b for b, t in self.idle if now - t > self.idle_timeout]
+        if expired:
+            self.idle = [(b, t) for b, t in self.idle if now - t <= self.idle_timeout]
+            self.size -= len(expired)
+            self.free_slots.extend(b.profile_slot for b in expired)
+            self.stats["expired"] += len(expired)
+        return expired
+
+    def acquire(self, logger=None, timeout=None):
+        """
+        租用一个浏览器 (driver 已启动)。排在队首且有空闲浏览器或空余名额时才能拿到，保证先到先得。
+        timeout 秒内未拿到抛出 TimeoutError。
+        """
+        deadline = None if timeout is None else time.time() + timeout
+        ticket = object()
+        with self.cond:
+            if self.closed:
+                raise RuntimeError("浏览器池已关闭")
+            self.waiters.append(ticket)
+            if logger and (len(self.waiters) > 1 or (not self.idle and self.size >= self.max_size)):
+                logger(f"浏览器已全部占用，排队等待中 (前面还有 {len(self.waiters) - 1} 个任务)...")
+            try:
+                while not (self.waiters[0] is ticket and (self.idle or self.size < self.max_size)):
+                    remaining = None if deadline is None else deadline - time.time()
+                    if remaining is not None and remaining <= 0:
+                        raise TimeoutError("等待空闲浏览器超时")
+                    self.cond.wait(remaining)
+                    if self.closed:
+                        raise RuntimeError("浏览器池已关闭")
+            except BaseException:
+                self.waiters.remove(ticket)
+                self.cond.notify_all()
+                raise
+            self.waiters.popleft()
+            browser = self.idle.pop()[0] if self.idle else None
+            if browser is None:
+                # 先占名额再在锁外启动浏览器
+                self.size += 1
+                slot = self.free_slots.pop(0)
+            else:
+                slot = browser.profile_slot
+            self.cond.notify_all()
+
+        if browser is not None and not browser.is_alive():
+            self.stats["unhealthy"] += 1
+            self._discard(browser)
+            browser = None
+        try:
+            if browser is None:
+                browser = self._create(slot)
+                self.stats["created"] += 1
+            else:
+                self.stats["reused"] += 1
+            browser.logger = logger
+            browser.init_driver()
+        except BaseException:
+            if browser is not None:
+                self._discard(browser)
+            with self.cond:
+                self.size -= 1
+                self.free_slots.append(slot)
+                self.cond.notify_all()
+            raise
+        self.stats["leases"] += 1
+        return browser
+
+    def release(self, browser, broken=False):
+        """归还浏览器：失效、达到页数上限或池已关闭时关闭它，否则放回空闲列表"""
+        browser.logger = None
+        browser.wait_report = WaitReport()
+        recycle = broken or self.closed or not browser.is_alive()
+        if not recycle and self.max_pages and browser.pages_served >= self.max_pages:
+            self.stats["recycled"] += 1
+            recycle = True
+        if not recycle:
+            recycle = not browser.reset()
+        if recycle:
+            self._discard(browser)
+        with self.cond:
+            if recycle:
+                self.size -= 1
+                self.free_slots.append(browser.profile_slot)
+            else:
+                self.idle.append((browser, time.time()))
+            expired = self._reap_idle()
+            self.cond.notify_all()
+        for b in expired:
+            self._discard(b)
+
+    @contextlib.contextmanager
+    def lease(self, logger=None, timeout=None):
+        browser = self.acquire(logger, timeout)
+        try:
+            yield browser
+        finally:
+            self.release(browser)
+
+    def summary(self):
+        with self.cond:
+            return {
+                "size": self.size,
+                "idle": len(self.idle),
+                "waiting": len(self.waiters),
+                "max_size": self.max_size,
+                **self.stats
+            }
+
+    def close(self):
+        """关闭全部空闲浏览器；正在使用的在归还时关闭"""
+        with self.cond:
+            self.closed = True
+            idle = [b for b, _ in self.idle]
+            self.idle = []
+            self.size -= len(idle)
+            self.free_slots.extend(b.profile_slot for b in idle)
+            self.cond.notify_all()
+        for b in idle:
+            self._discard(b)
@@ -0,0 +1,87 @@
+import json
+import os
+import shutil
+import threading
+import time
+
+
+class PageCheckpoint(object):
+    """
+    按页断点：每完成一页 (该页全部记录的详情都已解析写出)，把该页的列表记录和数据行追加到 pages.jsonl。
+    - 每页追加后 fsync，再原子替换 manifest.json (已完成页码、pages.jsonl 有效字节数)
+    - 进程在写入中途崩溃时，pages.jsonl 末尾可能残留半行；读取时只认 manifest 记录的长度
+    - 续爬时先回放已完成页的数据行，再从最后完成页的下一页继续
+    """
+
+    def __init__(self, path):
+        if not os.path.exists(path):
+            os.makedirs(path)
+        self.path = path
+        self.data_path = os.path.join(path, "pages.jsonl")
+        self.manifest_path = os.path.join(path, "manifest.json")
+        self.lock = threading.Lock()
+        self.manifest = {"pages": [], "size": 0, "rows": 0, "updated_at": None}
+        if os.path.exists(self.manifest_path):
+            with open(self.manifest_path, encoding="utf-8") as f:
+                self.manifest = json.load(f)
+
+    @property
+    def pages(self):
+        return list(self.manifest["pages"])
+
+    @property
+    def last_page(self):
+        return max(self.manifest["pages"]) if self.manifest["pages"] else None
+
+    @property
+    def row_count(self):
+        return self.manifest["rows"]
+
+    def add_page(self, page_idx, records, rows):
+        """记录一页已完成 (由流水线在该页最后一条记录写出后调用)"""
+        line = json.dumps({"page": page_idx, "records": records, "rows": rows}, ensure_ascii=False) + "\n"
+        data = line.encode("utf-8")
+        with self.lock:
+            with open(self.data_path, "ab") as f:
+                # 丢弃上次崩溃时残留在有效长度之后的半行
+                f.truncate(self.manifest["size"])
+                f.write(data)
+                f.flush()
+                os.fsync(f.fileno())
+            manifest = dict(self.manifest)
+            manifest["pages"] = self.manifest["pages"] + [page_idx]
+            manifest["size"] = self.manifest["size"] + len(data)
+            manifest["rows"] = self.manifest["rows"] + len(rows)
+            manifest["updated_at"] = time.time()
+            self._write_manifest(manifest)
+            self.manifest = manifest
+
+    def _write_manifest(self, manifest):
+        tmp_path = self.manifest_path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(manifest, f, ensure_ascii=False)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.manifest_path)
+        try:
+            # 目录项也落盘，保证 rename 本身不会因断电丢失 (Windows 不支持打开目录，忽略)
+            fd = os.open(self.path, os.O_RDONLY)
+            try:
+                os.fsync(fd)
+            finally:
+                os.close(fd)
+        except OSError:
+            pass
+
+    def iter_pages(self):
+        """按完成顺序返回已完成页 {"page", "records", "rows"}，只读取 manifest 记录的有效长度"""
+        size = self.manifest["size"]
+        if not size:
+            return
+        with open(self.data_path, "rb") as f:
+            data = f.read(size)
+        for line in data.splitlines():
+            yield json.loads(line)
+
+    def remove(self):
+        shutil.rmtree(self.path, ignore_errors=True)
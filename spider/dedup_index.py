@@ -0,0 +1,140 @@
+import hashlib
+import math
+import re
+import threading
+import time
+import unicodedata
+from decimal import Decimal, InvalidOperation
+
+from spider.storage import connect
+
+_SPACES = re.compile(r"\s+")
+
+
+def normalize_text(value):
+    # 全角 -> 半角、去掉所有空白、忽略大小写，避免排版差异导致同一行被当成新行
+    return _SPACES.sub("", unicodedata.normalize("NFKC", str(value or ""))).lower()
+
+
+def normalize_amount(value):
+    text = normalize_text(value).replace(",", "")
+    try:
+        return format(Decimal(text).normalize(), "f")
+    except (InvalidOperation, ValueError):
+        return text
+
+
+def row_fingerprint(row):
+    """子行指纹：公告链接 (含 id) + 规范化的 采购项目名称 + 预算金额"""
+    key = "\x1f".join([row.get("Link", ""), normalize_text(row.get("采购项目名称")),
+                       normalize_amount(row.get("预算金额(万元)"))])
+    return "r:" + hashlib.blake2b(key.encode("utf-8"), digest_size=16).hexdigest()
+
+
+def announcement_key(link):
+    return "a:" + link
+
+
+class BloomFilter(object):
+    """
+    内存布隆过滤器：判断"一定没见过"只需计算 k 个位，不查库。
+    capacity / error_rate 决定位数组大小 (默认 100 万条、0.1% 误判约 1.7MB)。
+    """
+
+    def __init__(self, capacity=1000000, error_rate=0.001):
+        self.bits_count = max(8, int(-capacity * math.log(error_rate) / (math.log(2) ** 2)))
+        self.hashes = max(1, round(self.bits_count / capacity * math.log(2)))
+        self.bits = bytearray((self.bits_count + 7) // 8)
+
+    def _positions(self, key):
+        digest = hashlib.blake2b(key.encode("utf-8"), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], "little")
+        h2 = int.from_bytes(digest[8:], "little") | 1
+        return [(h1 + i * h2) % self.bits_count for i in range(self.hashes)]
+
+    def add(self, key):
+        for pos in self._positions(key):
+            self.bits[pos >> 3] |= 1 << (pos & 7)
+
+    def __contains__(self, key):
+        return all(self.bits[pos >> 3] & (1 << (pos & 7)) for pos in self._positions(key))
+
+
+class DedupIndex(object):
+    """
+    跨任务 / 跨天的去重索引 (SQLite WAL + 内存布隆过滤器前置)。
+    - 键: 公告 (详情链接) 与子行指纹 (链接 + 项目名称 + 预算金额)
+    - 查询先过布隆过滤器，未命中即确定是新内容；命中时再查库排除误判
+    - 行写出后才登记 (add_rows)，写出前崩溃的行下次仍视为新行；详情抓取失败的公告只登记兜底行，不登记公告
+    - 启动时把库中已有的键全部装入布隆过滤器 (容量至少为键数的两倍)，stats() 统计过滤器直接排除 / 查库次数
+    """
+
+    def __init__(self, path="cache/dedup_index.sqlite3", capacity=1000000, error_rate=0.001):
+        self.path = path
+        self.lock = threading.Lock()
+        self.stats_counter = {"bloom_negative": 0, "db_lookups": 0, "known": 0, "added": 0}
+
+        self.conn = connect(path)
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS dedup_keys (
+                key TEXT PRIMARY KEY,
+                first_seen REAL NOT NULL
+            ) WITHOUT ROWID
+        """)
+        self.conn.commit()
+
+        # 启动时把已有键装入布隆过滤器；容量至少留出一倍余量
+        self.count = self.conn.execute("SELECT COUNT(*) FROM dedup_keys").fetchone()[0]
+        self.bloom = BloomFilter(max(capacity, self.count * 2), error_rate)
+        for (key,) in self.conn.execute("SELECT key FROM dedup_keys"):
+            self.bloom.add(key)
+
+    def _contains(self, key):
+        if key not in self.bloom:
+            self.stats_counter["bloom_negative"] += 1
+            return False
+        self.stats_counter["db_lookups"] += 1
+        found = self.conn.execute("SELECT 1 FROM dedup_keys WHERE key=?", (key,)).fetchone() is not None
+        if found:
+            self.stats_counter["known"] += 1
+        return found
+
+    def has_announcement(self, link):
+        with self.lock:
+            return self._contains(announcement_key(link))
+
+    def new_rows(self, rows):
+        """返回 rows 中索引里没有的行 (只查询，不登记)"""
+        with self.lock:
+            return [row for row in rows if not self._contains(row_fingerprint(row))]
+
+    def add_rows(self, rows, skip_announcements=()):
+        """
+        登记已写出的行及其所属公告。
+        skip_announcements: 不登记为公告的链接 (详情抓取失败、只写出了兜底行)，
+        否则只导出新内容时该公告会被永久跳过，再也拿不到真实的子行。
+        """
+        if not rows:
+            return
+        now = time.time()
+        keys = {row_fingerprint(row) for row in rows}
+        keys.update(announcement_key(row["Link"]) for row in rows
+                    if row.get("Link") and row["Link"] not in skip_announcements)
+        with self.lock:
+            cur = self.conn.executemany(
+                "INSERT OR IGNORE INTO dedup_keys (key, first_seen) VALUES (?, ?)", [(key, now) for key in keys]
+            )
+            self.conn.commit()
+            added = max(cur.rowcount, 0)
+            self.count += added
+            self.stats_counter["added"] += added
+            for key in keys:
+                self.bloom.add(key)
+
+    def stats(self):
+        with self.lock:
+            return dict(self.stats_counter, keys=self.count)
+
+    def close(self):
+        with self.lock:
+            self.conn.close()
@@ -0,0 +1,126 @@
+import json
+import threading
+import time
+import zlib
+
+from spider.storage import connect
+
+
+class DetailCache(object):
+    """
+    详情页 HTML 的本地 SQLite 缓存，键为 (id, colCode, oldData)。
+    - 内容 zlib 压缩存储
+    - 总大小超过 max_bytes 时按最近访问时间淘汰 (LRU)
+    - ttl (秒) 可选，过期条目视为未命中并删除
+    - 可附带 getDetail 响应中的元数据 (发布人等，JSON)，命中缓存时一并取回
+    单连接 + 锁，可被多个爬虫线程/任务共享。
+    """
+
+    def __init__(self, path="cache/detail_cache.sqlite3", max_bytes=512 * 1024 * 1024, ttl=None):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.lock = threading.Lock()
+
+        self.conn = connect(path)
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS detail_cache (
+                id TEXT NOT NULL,
+                col_code TEXT NOT NULL,
+                old_data TEXT NOT NULL,
+                html BLOB NOT NULL,
+                size INTEGER NOT NULL,
+                created_at REAL NOT NULL,
+                accessed_at REAL NOT NULL,
+                meta TEXT,
+                PRIMARY KEY (id, col_code, old_data)
+            )
+        """)
+        # 旧版缓存库没有 meta 列
+        columns = [row[1] for row in self.conn.execute("PRAGMA table_info(detail_cache)")]
+        if "meta" not in columns:
+            self.conn.execute("ALTER TABLE detail_cache ADD COLUMN meta TEXT")
+        self.conn.execute("CREATE INDEX IF NOT EXISTS idx_detail_cache_accessed ON detail_cache(accessed_at)")
+        self.conn.commit()
+        self.total_bytes = self.conn.execute("SELECT COALESCE(SUM(size), 0) FROM detail_cache").fetchone()[0]
+
+    @staticmethod
+    def _key(id_val, col_code, old_data):
+        return str(id_val), str(col_code), str(old_data)
+
+    def get(self, id_val, col_code, old_data=0, with_meta=False):
+        """返回缓存的 HTML (未命中为 None)；with_meta=True 时返回 (html, meta)"""
+        key = self._key(id_val, col_code, old_data)
+        now = time.time()
+        miss = (None, None) if with_meta else None
+        with self.lock:
+            row = self.conn.execute(
+                "SELECT html, size, created_at, meta FROM detail_cache WHERE id=? AND col_code=? AND old_data=?", key
+            ).fetchone()
+            if row is None:
+                self.misses += 1
+                return miss
+            blob, size, created_at, meta = row
+            if self.ttl is not None and now - created_at > self.ttl:
+                self.conn.execute("DELETE FROM detail_cache WHERE id=? AND col_code=? AND old_data=?", key)
+                self.conn.commit()
+                self.total_bytes -= size
+                self.misses += 1
+                return miss
+            self.conn.execute(
+                "UPDATE detail_cache SET accessed_at=? WHERE id=? AND col_code=? AND old_data=?", (now,) + key
+            )
+            self.conn.commit()
+            self.hits += 1
+        html = zlib.decompress(blob).decode("utf-8")
+        if with_meta:
+            return html, json.loads(meta) if meta else None
+        return html
+
+    def put(self, id_val, col_code, old_data, html, meta=None):
+        if not html:
+            return
+        key = self._key(id_val, col_code, old_data)
+        blob = zlib.compress(html.encode("utf-8"))
+        meta = json.dumps(meta, ensure_ascii=False) if meta else None
+        now = time.time()
+        with self.lock:
+            old = self.conn.execute(
+                "SELECT size FROM detail_cache WHERE id=? AND col_code=? AND old_data=?", key
+            ).fetchone()
+            if old:
+                self.total_bytes -= old[0]
+            self.conn.execute(
+                "INSERT OR REPLACE INTO detail_cache (id, col_code, old_data, html, size, created_at, accessed_at, meta) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                key + (blob, len(blob), now, now, meta)
+            )
+            self.total_bytes += len(blob)
+            self._evict()
+            self.conn.commit()
+
+    def _evict(self):
+        """按 LRU 淘汰，直到总大小回到上限以内 (调用方持锁)"""
+        while self.total_bytes > self.max_bytes:
+            rows = self.conn.execute(
+                "SELECT id, col_code, old_data, size FROM detail_cache ORDER BY accessed_at LIMIT 100"
+            ).fetchall()
+            if not rows:
+                self.total_bytes = 0
+                return
+            for id_val, col_code, old_data, size in rows:
+                self.conn.execute(
+                    "DELETE FROM detail_cache WHERE id=? AND col_code=? AND old_data=?", (id_val, col_code, old_data)
+                )
+                self.total_bytes -= size
+                if self.total_bytes <= self.max_bytes:
+                    return
+
+    def stats(self):
+        return f"命中 {self.hits} / 未命中 {self.misses}, 占用 {self.total_bytes / 1024 / 1024:.1f} MB"
+
+    def close(self):
+        with self.lock:
+            self.conn.close()
@@ -0,0 +1,71 @@
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+
+class AsyncDetailFetcher(object):
+    """
+    asyncio 详情页引擎：并发数与请求速率由 AimdController 动态调节。
+    - 每个请求先向令牌桶预订令牌 (替代固定的 2-5 秒休眠)
+    - 在途请求数不超过 controller.concurrency
+    - 拦截/5xx 按指数退避重试，结果反馈给 controller
+    HTTP 请求仍走 Shandong 的同步方法，放在线程池中执行以复用连接池 Session；解析由流水线的解析阶段负责。
+    """
+
+    def __init__(self, spider, controller, max_retries=2, backoff=5.0):
+        self.spider = spider
+        self.controller = controller
+        self.max_retries = max_retries
+        self.backoff = backoff
+
+    def fetch_all(self, records):
+        """抓取一批记录的详情 HTML，返回与 records 顺序对齐的列表 (失败为 None)"""
+        if not records:
+            return []
+        return asyncio.run(self._fetch_all(records))
+
+    async def _fetch_all(self, records):
+        loop = asyncio.get_running_loop()
+        results = [None] * len(records)
+        cond = asyncio.Condition()
+        in_flight = 0
+
+        async def worker(idx, record):
+            nonlocal in_flight
+            async with cond:
+                await cond.wait_for(lambda: in_flight < self.controller.concurrency)
+                in_flight += 1
+            try:
+                results[idx] = await self._process(loop, executor, record)
+            finally:
+                async with cond:
+                    in_flight -= 1
+                    cond.notify_all()
+
+        with ThreadPoolExecutor(max_workers=self.controller.max_concurrency) as executor:
+            await asyncio.gather(*(worker(i, rec) for i, rec in enumerate(records)))
+        return results
+
+    async def _process(self, loop, executor, record):
+        spider = self.spider
+        spider._log(f"[{record.get('areaName', '未知')}] 解析中: {record.get('title', '无标题')}")
+
+        html = None
+        for attempt in range(self.max_retries + 1):
+            delay = self.controller.bucket.acquire_delay()
+            if delay > 0:
+                await asyncio.sleep(delay)
+
+            t0 = time.monotonic()
+            html, status = await loop.run_in_executor(
+                executor, spider.fetch_detail, record['id'], record['colCode'], record.get('oldData', 0)
+            )
+            self.controller.on_result(status, time.monotonic() - t0)
+
+            if status in ("blocked", "server_error") and attempt < self.max_retries:
+                wait = self.backoff * (2 ** attempt)
+                spider._log(f"详情页 {record['id']} 第 {attempt + 1} 次失败 ({status})，{wait:.0f} 秒后重试")
+                await asyncio.sleep(wait)
+                continue
+            break
+        return html
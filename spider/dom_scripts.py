@@ -0,0 +1,88 @@
+"""
+页面内批量提取脚本：每个操作一次 execute_script 取回全部需要的数据和元素，
+代替逐个元素调用 .text / get_attribute / is_displayed (每次调用都是一次 WebDriver HTTP 往返)。
+返回值中的 DOM 元素会被 Selenium 自动转换为 WebElement，可直接 click。
+"""
+
+# 与 Selenium is_displayed 近似：有布局盒子即视为可见
+_VISIBLE = "const visible = e => !!(e && (e.offsetWidth || e.offsetHeight || e.getClientRects().length));"
+
+# 列表页数据行：每行的可见性、单元格文本、标题点击目标，以及调试用的 class/style
+LIST_ROWS = _VISIBLE + """
+const rows = Array.from(document.querySelectorAll('table:not(.el-date-table) tbody tr'))
+    .filter(r => !(r.getAttribute('class') || '').includes('el-date-table__row'));
+return rows.map(r => {
+    const cells = Array.from(r.querySelectorAll('td'));
+    const titleCell = cells[2];
+    return {
+        visible: visible(r),
+        cells: cells.map(td => td.innerText.trim()),
+        target: titleCell ? (titleCell.querySelector('span') || titleCell) : null,
+        cls: r.getAttribute('class') || '',
+        style: r.getAttribute('style') || '',
+        parent_cls: r.parentElement ? (r.parentElement.getAttribute('class') || '') : '',
+        parent_style: r.parentElement ? (r.parentElement.getAttribute('style') || '') : ''
+    };
+});
+"""
+
+# 分页状态：下一页按钮及其可用性、当前页码输入框的值
+PAGINATION = """
+const btn = document.querySelector('button.btn-next');
+const inp = document.querySelector('.el-pagination__editor input');
+return {
+    next: btn,
+    next_class: btn ? (btn.getAttribute('class') || '') : '',
+    next_disabled: btn ? btn.getAttribute('disabled') : null,
+    next_enabled: btn ? !btn.disabled : false,
+    page: inp ? inp.value : ''
+};
+"""
+
+# 验证码状态：图片 (可见性、src)、刷新按钮、验证码输入框
+CAPTCHA = _VISIBLE + """
+const img = document.querySelector('div.n-captcha img');
+const input = Array.from(document.querySelectorAll('input')).find(i =>
+    (i.getAttribute('placeholder') || '').includes('验证码') || (i.getAttribute('aria-label') || '').includes('验证码'));
+return {
+    img: img,
+    visible: visible(img),
+    src: img ? (img.getAttribute('src') || '') : '',
+    refresh: document.querySelector('div.n-captcha i.refresh-icon'),
+    input: input || null
+};
+"""
+
+# 按 XPath 取元素及其激活状态和文本 (arguments[0] = XPath)
+XPATH_STATE = """
+const el = document.evaluate(arguments[0], document, null, XPathResult.FIRST_ORDERED_NODE_TYPE, null).singleNodeValue;
+return el ? {el: el, active: (el.getAttribute('class') || '').includes('is_active'), text: el.innerText.trim()} : null;
+"""
+
+# 时间范围快捷按钮：class 含 item 且文本完全匹配的第一个可见 div (arguments[0] = 按钮文本)
+QUICK_TIME_BUTTON = _VISIBLE + """
+const div = Array.from(document.querySelectorAll('div')).find(d =>
+    (d.getAttribute('class') || '').includes('item') && visible(d) && d.innerText.trim() === arguments[0]);
+return div ? {el: div, active: (div.getAttribute('class') || '').includes('is_active')} : null;
+"""
+
+# 文本包含关键字的第一个可见按钮 (arguments[0] = 关键字)
+BUTTON_BY_TEXT = _VISIBLE + """
+return Array.from(document.querySelectorAll('button')).find(b => visible(b) && b.innerText.includes(arguments[0])) || null;
+"""
+
+# placeholder 包含关键字的第一个输入框 (arguments[0] = 关键字)
+INPUT_BY_PLACEHOLDER = """
+return Array.from(document.querySelectorAll('input')).find(i => (i.getAttribute('placeholder') || '').includes(arguments[0])) || null;
+"""
+
+# 列表区域状态：是否有加载遮罩、列表签名 (页码 + 首行文本 + 行数，用于判断是否已刷新)、是否出现验证码错误提示
+LIST_STATE = _VISIBLE + """
+const rows = document.querySelectorAll('table:not(.el-date-table) tbody tr');
+const inp = document.querySelector('.el-pagination__editor input');
+return {
+    loading: Array.from(document.querySelectorAll('.el-loading-mask')).some(visible),
+    sig: (inp ? inp.value : '') + '|' + (rows.length ? rows[0].innerText : '') + '|' + rows.length,
+    captcha_error: document.documentElement.innerHTML.includes('验证码错误')
+};
+"""
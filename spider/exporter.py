@@ -0,0 +1,121 @@
+import csv
+import json
+
+from openpyxl import Workbook
+
+from spider.storage import ensure_parent_dir
+
+# 导出列顺序 (固定)
+EXPORT_COLUMNS = [
+    "序号",
+    "地区",
+    "标题",
+    "发布人",  # 新增发布人列
+    "采购方式",
+    "项目类型",
+    "发布时间",
+    "子序号",
+    "采购项目名称",
+    "采购需求概况",
+    "预算金额(万元)",
+    "拟面向中小企业预留",
+    "预计采购时间",
+    "备注",
+    "Link"
+]
+
+
+class ExportSink(object):
+    """
+    流式导出：流水线每解析出一条记录的行就立即写盘，不在内存里保留整份数据。
+    缺失的列补空字符串，多余的字段忽略，列顺序固定为 EXPORT_COLUMNS。
+    """
+    extension = ""
+
+    def __init__(self, path, columns=EXPORT_COLUMNS):
+        self.path = path
+        self.columns = list(columns)
+        self.row_count = 0
+        ensure_parent_dir(path)
+
+    def _values(self, row):
+        return [row.get(col, "") for col in self.columns]
+
+    def write_rows(self, rows):
+        for row in rows:
+            self._write(self._values(row))
+            self.row_count += 1
+
+    def _write(self, values):
+        raise NotImplementedError
+
+    def close(self):
+        pass
+
+
+class XlsxSink(ExportSink):
+    """openpyxl write-only 模式：逐行写入，内存占用与行数无关"""
+    extension = "xlsx"
+
+    def __init__(self, path, columns=EXPORT_COLUMNS):
+        super().__init__(path, columns)
+        self.workbook = Workbook(write_only=True)
+        self.sheet = self.workbook.create_sheet("Sheet1")
+        self.sheet.append(self.columns)
+
+    def _write(self, values):
+        self.sheet.append(values)
+
+    def close(self):
+        if self.workbook is not None:
+            self.workbook.save(self.path)
+            self.workbook = None
+
+
+class CsvSink(ExportSink):
+    extension = "csv"
+
+    def __init__(self, path, columns=EXPORT_COLUMNS):
+        super().__init__(path, columns)
+        # utf-8-sig: Excel 直接打开不乱码
+        self.fp = open(path, "w", encoding="utf-8-sig", newline="")
+        self.writer = csv.writer(self.fp)
+        self.writer.writerow(self.columns)
+
+    def _write(self, values):
+        self.writer.writerow(values)
+
+    def close(self):
+        if not self.fp.closed:
+            self.fp.close()
+
+
+class JsonlSink(ExportSink):
+    extension = "jsonl"
+
+    def __init__(self, path, columns=EXPORT_COLUMNS):
+        super().__init__(path, columns)
+        self.fp = open(path, "w", encoding="utf-8")
+
+    def _write(self, values):
+        self.fp.write(json.dumps(dict(zip(self.columns, values)), ensure_ascii=False))
+        self.fp.write("\n")
+
+    def close(self):
+        if not self.fp.closed:
+            self.fp.close()
+
+
+SINKS = {
+    "xlsx": XlsxSink,
+    "csv": CsvSink,
+    "jsonl": JsonlSink,
+}
+
+
+def open_sink(fmt, path_without_ext):
+    """按格式创建导出器，文件扩展名由格式决定"""
+    cls = SINKS.get(fmt)
+    if cls is None:
+        raise ValueError(f"不支持的导出格式: {fmt}")
+    return cls(f"{path_without_ext}.{cls.extension}")
@@ -0,0 +1,38 @@
+import random
+
+import requests
+from requests.adapters import HTTPAdapter
+
+# 山东政府采购网 API 请求头模板 (user-agent 在建 Session 时随机选定一次)
+HEADER_TEMPLATE = {
+    "accept": "application/json, text/plain, */*",
+    # "accept-encoding": "gzip, deflate", # requests usually handles this
+    "accept-language": "zh-CN,zh;q=0.9",
+    "connection": "keep-alive",
+    "content-type": "application/json;charset=UTF-8",
+    "host": "www.ccgp-shandong.gov.cn:8087",
+    "origin": "http://www.ccgp-shandong.gov.cn",
+    "referer": "http://www.ccgp-shandong.gov.cn/",
+}
+
+
+def build_headers(user_agents):
+    headers = dict(HEADER_TEMPLATE)
+    headers["user-agent"] = random.choice(user_agents)
+    return headers
+
+
+def build_session(user_agents, pool_size=2, proxies=None):
+    """
+    创建带连接池的 keep-alive Session。
+    pool_size 应与详情页并发线程数一致，否则多出的线程每次都要新建 TCP 连接。
+    """
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=max(1, pool_size))
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    session.headers.clear()
+    session.headers.update(build_headers(user_agents))
+    if proxies:
+        session.proxies.update(proxies)
+    return session
@@ -0,0 +1,157 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from spider.dedup_index import row_fingerprint
+
+# 全省地区代码 -> 名称 (省本级 + 各地市)
+REGIONS = {
+    "370000": "山东省本级",
+    "370100": "济南市",
+    "370200": "青岛市",
+    "370300": "淄博市",
+    "370400": "枣庄市",
+    "370500": "东营市",
+    "370600": "烟台市",
+    "370700": "潍坊市",
+    "370800": "济宁市",
+    "370900": "泰安市",
+    "371000": "威海市",
+    "371100": "日照市",
+    "371200": "莱芜市",  # 2019 年并入济南市，网站仍保留该地区代码及其历史公告
+    "371300": "临沂市",
+    "371400": "德州市",
+    "371500": "聊城市",
+    "371600": "滨州市",
+    "371700": "菏泽市",
+}
+
+
+class MergedSink(object):
+    """
+    多个地区写同一个导出文件：加锁串行写入，按子行指纹 (链接 + 规范化的项目名称 + 预算金额) 去重
+    (同一公告可能出现在多个地区的结果里)。子序号不能作为键：错位修正的行子序号为空，
+    同一公告的第二张表又从 1 开始编号。
+    for_region() 返回供单个地区 Shandong.run(sink=...) 使用的适配器。
+    """
+
+    def __init__(self, sink):
+        self.sink = sink
+        self.lock = threading.Lock()
+        self.seen = set()
+        self.duplicates = 0
+
+    def write_rows(self, rows, on_written=None):
+        with self.lock:
+            fresh = []
+            for row in rows:
+                key = row_fingerprint(row)
+                if key in self.seen:
+                    self.duplicates += 1
+                    continue
+                self.seen.add(key)
+                fresh.append(row)
+            self.sink.write_rows(fresh)
+        if on_written:
+            on_written(len(fresh), len(rows) - len(fresh))
+
+    def for_region(self, progress):
+        return _RegionSink(self, progress)
+
+    @property
+    def row_count(self):
+        return self.sink.row_count
+
+    @property
+    def path(self):
+        return self.sink.path
+
+    def close(self):
+        self.sink.close()
+
+
+class _RegionSink(object):
+    def __init__(self, merged, progress):
+        self.merged = merged
+        self.progress = progress
+
+    def write_rows(self, rows):
+        self.merged.write_rows(rows, self._count)
+
+    def _count(self, written, duplicates):
+        self.progress["exported"] += written
+        self.progress["duplicates"] += duplicates
+
+
+class MultiRegionJob(object):
+    """
+    多地区并行爬取：每个地区一个 Shandong 实例 (独立会话 / 租用浏览器池)，最多 workers 个地区同时进行。
+    - spider_factory() 创建爬虫实例；调用方应让所有实例共享同一个 PolitenessScheduler 和详情限速器，
+      这样无论并行多少个地区，同一主机的总请求速率都受同一预算约束
+    - 结果经 MergedSink 去重后写入同一个导出文件
+    - progress 按地区记录状态与计数，可随时读取；地区运行异常、被拦截 / 验证码中断都记为 failed
+    """
+
+    def __init__(self, spider_factory, regions, sink, workers=3, log_func=None):
+        self.spider_factory = spider_factory
+        self.regions = list(regions)
+        self.sink = MergedSink(sink)
+        self.workers = max(1, workers)
+        self.log_func = log_func
+        self.spiders = {}
+        # 有地区失败时为失败汇总，全部成功为 None
+        self.last_error = None
+        self.progress = {
+            code: {"name": REGIONS.get(code, code), "status": "pending",
+                   "pages": 0, "records": 0, "rows": 0, "exported": 0, "duplicates": 0}
+            for code in self.regions
+        }
+
+    def _log(self, msg):
+        if self.log_func:
+            self.log_func(msg)
+        else:
+            print(msg)
+
+    def _run_region(self, code, crawl_kwargs):
+        state = self.progress[code]
+        name = state["name"]
+        state["status"] = "running"
+        try:
+            spider = self.spider_factory()
+            # 日志加地区前缀，便于在合并的任务日志里区分
+            spider.log_func = lambda msg: self._log(f"[{name}] {msg}")
+            spider.progress = state
+            self.spiders[code] = spider
+            spider.run(area=code, sink=self.sink.for_region(state), **crawl_kwargs)
+            # run() 自己捕获运行异常，结果要看 last_error / list_completed
+            error = spider.interruption()
+        except Exception as e:
+            error = str(e)
+        if error is None:
+            state["status"] = "completed"
+            return
+        state["status"] = "failed"
+        state["error"] = error
+        self._log(f"[{name}] 地区任务失败: {error}")
+
+    def run(self, **crawl_kwargs):
+        """crawl_kwargs 透传给 Shandong.run (max_pages / title / start_time / engine ...)"""
+        self._log(f"多地区任务: 共 {len(self.regions)} 个地区，最多 {self.workers} 个并行")
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            for code in self.regions:
+                executor.submit(self._run_region, code, crawl_kwargs)
+        failed = [s["name"] for s in self.progress.values() if s["status"] == "failed"]
+        self._log(f"多地区任务结束: 导出 {self.sink.row_count} 行，跨地区重复 {self.sink.duplicates} 行"
+                  + (f"，失败地区: {'、'.join(failed)}" if failed else ""))
+        if failed:
+            self.last_error = f"{len(failed)}/{len(self.regions)} 个地区失败: {'、'.join(failed)}"
+        return self.progress
+
+    def summary(self):
+        """汇总进度 (供任务状态持久化)"""
+        totals = {"pages": 0, "records": 0, "rows": 0}
+        for state in self.progress.values():
+            for key in totals:
+                totals[key] += state.get(key, 0)
+        totals["regions"] = {code: dict(state) for code, state in self.progress.items()}
+        return totals
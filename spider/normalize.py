@@ -0,0 +1,58 @@
+import pandas as pd
+
+# 金额: 数字 + 可选单位；列名约定单位为万元，不带单位的数字按万元处理
+_AMOUNT = r"(-?\d+(?:\.\d+)?)(亿元|亿|万元|万|元)?"
+_UNIT_SCALE = {"亿元": 10000.0, "亿": 10000.0, "万元": 1.0, "万": 1.0, "元": 0.0001}
+
+# 年月: 2025年3月 / 2025-03 / 2025.3.15 / 2025/3
+_YEAR_MONTH = r"(\d{4})\s*[年\-./]\s*(\d{1,2})"
+
+
+def _text(series):
+    # 全角数字、符号转半角，去掉千分位和空白
+    return (series.fillna("").astype(str).str.normalize("NFKC")
+            .str.replace(r"[,\s]", "", regex=True))
+
+
+def normalize_budget(series):
+    """预算金额文本 -> 万元 (float)，无法识别为 NaN。如 "120.5" / "1,200万元" / "50000元" / "1.2亿" """
+    parts = _text(series).str.extract(_AMOUNT)
+    value = pd.to_numeric(parts[0], errors="coerce")
+    scale = parts[1].map(_UNIT_SCALE).fillna(1.0)
+    return value * scale
+
+
+def normalize_month(series):
+    """年月文本 -> "YYYY-MM"，无法识别为 None。如 "2025年3月" / "2025-03-15" """
+    parts = _text(series).str.extract(_YEAR_MONTH)
+    month = pd.to_numeric(parts[1], errors="coerce")
+    result = parts[0] + "-" + parts[1].str.zfill(2)
+    return result.where(month.between(1, 12), None)
+
+
+def normalize_date(series):
+    """发布时间 -> datetime64 (只取日期部分)，无法识别为 NaT"""
+    text = _text(series).str.slice(0, 10).str.replace(r"[/.]", "-", regex=True)
+    return pd.to_datetime(text, format="%Y-%m-%d", errors="coerce")
+
+
+def normalize_rows(rows):
+    """
+    整批导出行 -> DataFrame，在原字段基础上追加类型化列 (整列向量化转换，不逐行解析文本):
+    - budget: 预算金额，万元 (float)
+    - plan_month: 预计采购时间所在月份 "YYYY-MM"
+    - publish_date: 发布时间 (datetime64)；publish_month: 发布月份 "YYYY-MM"
+    """
+    frame = pd.DataFrame(rows)
+    empty = pd.Series([""] * len(frame), index=frame.index, dtype=object)
+    frame["budget"] = normalize_budget(frame.get("预算金额(万元)", empty))
+    frame["plan_month"] = normalize_month(frame.get("预计采购时间", empty))
+    frame["publish_date"] = normalize_date(frame.get("发布时间", empty))
+    frame["publish_month"] = frame["publish_date"].dt.strftime("%Y-%m").where(frame["publish_date"].notna(), None)
+    return frame
+
+
+def to_records(frame, columns):
+    """DataFrame 指定列 -> 可直接写入 SQLite 的元组列表 (NaN / NaT 转为 None)"""
+    values = frame[list(columns)].astype(object)
+    return list(values.where(values.notna(), None).itertuples(index=False, name=None))
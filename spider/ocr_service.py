@@ -0,0 +1,120 @@
+import collections
+import queue
+import threading
+import time
+
+_service = None
+_service_lock = threading.Lock()
+
+
+def get_ocr_service():
+    """进程内共享的 OCR 服务 (首次调用时创建)"""
+    global _service
+    with _service_lock:
+        if _service is None:
+            _service = OcrService()
+        return _service
+
+
+class OcrService(object):
+    """
+    验证码识别服务：模型只加载一次，多个浏览器共用。
+    - 后台线程启动即加载模型 (预热)，classify() 直接接收截图 PNG 字节，不经过 PIL
+    - 单个工作线程取请求，等待 batch_wait 秒把并发到达的请求凑成一批连续识别，
+      模型不会被多个线程同时调用
+    - 统计识别耗时、批大小，以及调用方通过 report() 反馈的验证码通过率
+    """
+
+    def __init__(self, batch_size=8, batch_wait=0.02, model_factory=None):
+        self.batch_size = batch_size
+        self.batch_wait = batch_wait
+        self.model_factory = model_factory
+        self.model = None
+        self.requests = queue.Queue()
+        self.lock = threading.Lock()
+        self.stats = collections.Counter()
+        self.latency_total = 0.0
+        self.latency_max = 0.0
+        self.model_load_time = None
+        self.worker = threading.Thread(target=self._worker, daemon=True)
+        self.worker.start()
+
+    def _load_model(self):
+        t0 = time.perf_counter()
+        if self.model_factory:
+            self.model = self.model_factory()
+        else:
+            import ddddocr
+            self.model = ddddocr.DdddOcr(show_ad=False)
+        self.model_load_time = time.perf_counter() - t0
+
+    def classify(self, image_bytes, timeout=30):
+        """识别一张验证码图片，返回识别文本；识别出错时抛出原异常"""
+        job = {"image": image_bytes, "submitted": time.perf_counter(), "done": threading.Event()}
+        self.requests.put(job)
+        if not job["done"].wait(timeout):
+            raise TimeoutError("验证码识别超时")
+        if "error" in job:
+            raise job["error"]
+        return job["result"]
+
+    def report(self, passed):
+        """调用方反馈识别结果是否通过网站校验"""
+        with self.lock:
+            self.stats["passed" if passed else "rejected"] += 1
+
+    def _worker(self):
+        # 启动即预热模型，第一张验证码无需等待加载
+        try:
+            self._load_model()
+        except Exception:
+            pass
+        while True:
+            batch = [self.requests.get()]
+            deadline = time.perf_counter() + self.batch_wait
+            while len(batch) < self.batch_size:
+                remaining = deadline - time.perf_counter()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self.requests.get(timeout=remaining))
+                except queue.Empty:
+                    break
+            self._run_batch(batch)
+
+    def _run_batch(self, batch):
+        if self.model is None:
+            try:
+                self._load_model()
+            except Exception as e:
+                for job in batch:
+                    job["error"] = e
+                    job["done"].set()
+                return
+        for job in batch:
+            try:
+                job["result"] = self.model.classification(job["image"])
+            except Exception as e:
+                job["error"] = e
+            latency = time.perf_counter() - job["submitted"]
+            with self.lock:
+                self.stats["errors" if "error" in job else "solved"] += 1
+                self.latency_total += latency
+                self.latency_max = max(self.latency_max, latency)
+            job["done"].set()
+        with self.lock:
+            self.stats["batches"] += 1
+
+    def summary(self):
+        with self.lock:
+            handled = self.stats["solved"] + self.stats["errors"]
+            reported = self.stats["passed"] + self.stats["rejected"]
+            return {
+                **self.stats,
+                "avg_latency": round(self.latency_total / handled, 4) if handled else None,
+                "max_latency": round(self.latency_max, 4),
+                "avg_batch": round(handled / self.stats["batches"], 2) if self.stats["batches"] else None,
+                "pass_rate": round(self.stats["passed"] / reported, 3) if reported else None,
+                "model_load_time": self.model_load_time,
+                "queued": self.requests.qsize()
+            }
@@ -0,0 +1,48 @@
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from spider.table_parser import PARSERS
+
+
+def parse_detail(parser, html):
+    """子进程入口：只解析表格，返回子行列表 (父级字段在主进程合并)"""
+    return PARSERS[parser](html)
+
+
+class ParsePool(object):
+    """
+    详情表格解析进程池。BeautifulSoup/lxml 解析是 CPU 任务，放在线程里会被 GIL 串行化；
+    放到子进程后解析吞吐随 CPU 核数线性扩展。
+    子进程意外退出导致进程池损坏 (BrokenProcessPool) 时自动重建，服务端多个任务共享同一个池也不会全部失效。
+    """
+
+    def __init__(self, parser="lxml", processes=None):
+        self.parser = parser
+        self.processes = processes or os.cpu_count() or 1
+        self.lock = threading.Lock()
+        self.executor = ProcessPoolExecutor(max_workers=self.processes)
+
+    def submit(self, html):
+        executor = self.executor
+        try:
+            return executor.submit(parse_detail, self.parser, html)
+        except BrokenProcessPool:
+            self.restart(executor)
+            return self.executor.submit(parse_detail, self.parser, html)
+
+    def restart(self, broken):
+        """重建已损坏的进程池 (多个线程同时发现时只重建一次)"""
+        with self.lock:
+            if self.executor is broken:
+                self.executor = ProcessPoolExecutor(max_workers=self.processes)
+                broken.shutdown(wait=False)
+
+    def map(self, htmls, chunksize=8):
+        """批量解析，返回与 htmls 对齐的子行列表"""
+        parsers = [self.parser] * len(htmls)
+        return list(self.executor.map(parse_detail, parsers, htmls, chunksize=chunksize))
+
+    def close(self):
+        self.executor.shutdown(wait=True)
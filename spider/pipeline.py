@@ -0,0 +1,185 @@
+import collections
+import queue
+import threading
+from concurrent.futures.process import BrokenProcessPool
+
+_DONE = object()
+# 详情阶段在每页最后一条记录之后放入的页结束标记 (占用行序位置)
+_PAGE_END = object()
+
+
+class CrawlPipeline(object):
+    """
+    列表 -> 详情 -> 解析 三段流水线。
+    - 列表阶段: 在调用线程中迭代 pages 生成器 (Selenium driver 不能跨线程使用)
+    - 详情阶段: 独立线程，按页调用 spider.fetch_htmls
+    - 解析阶段: 独立线程，逐条调用 spider.build_rows；
+                spider.parse_pool 存在时把 HTML 交给子进程解析，只在本线程合并父级字段
+    阶段之间用有界队列连接，下游变慢时上游在 put 处阻塞 (背压)，内存占用有上限。
+    某个阶段异常退出时继续消费上游队列直到结束标记，其余阶段照常结束，run() 再抛出该异常。
+    总耗时趋近 max(列表耗时, 详情耗时)，而不是两者之和。
+    """
+
+    def __init__(self, spider, page_buffer=2, parse_buffer=50, on_rows=None, on_page=None):
+        self.spider = spider
+        # on_rows 不为空时，每条记录的行解析完就交给它 (流式导出)，流水线本身不保留数据
+        self.on_rows = on_rows
+        # on_page(页码, records, 该页全部数据行) 在一页的所有行都写出后调用 (断点记录)
+        self.on_page = on_page
+        self.page_rows = {}
+        self.page_q = queue.Queue(maxsize=page_buffer)
+        self.html_q = queue.Queue(maxsize=parse_buffer)
+        self.results = {}
+        # 详情 / 解析阶段异常退出时记录的异常，run() 等各阶段结束后重新抛出
+        self.error = None
+
+    def _detail_stage(self):
+        try:
+            while True:
+                item = self.page_q.get()
+                if item is _DONE:
+                    break
+                if self.error is None:
+                    self._fetch_page(*item)
+        except Exception as e:
+            self._fail("详情", e)
+            self._drain(self.page_q)
+        finally:
+            self.html_q.put(_DONE)
+
+    def _fetch_page(self, page_idx, records):
+        try:
+            htmls = self.spider.fetch_htmls(records)
+        except Exception as e:
+            self.spider._log(f"第 {page_idx} 页详情抓取异常: {e}")
+            htmls = [None] * len(records)
+        self.spider.progress["records"] += len(records)
+        for i, (record, html) in enumerate(zip(records, htmls)):
+            if html is None:
+                # 详情未取到，只写出兜底行；该公告不登记到去重索引，下次仍会重新抓取
+                self.spider.detail_failed.add(self.spider.detail_link(record))
+            self.html_q.put((page_idx, i, record, html))
+        self.html_q.put((page_idx, _PAGE_END, records, None))
+
+    def _parse_stage(self):
+        pool = self.spider.parse_pool
+        # 进程池模式下保留有限个在途任务，结果按提交顺序在主进程合并父级字段
+        pending = collections.deque()
+        max_pending = pool.processes * 4 if pool else 0
+        try:
+            while True:
+                item = self.html_q.get()
+                if item is _DONE:
+                    break
+                page_idx, i, record, html = item
+                if i is _PAGE_END:
+                    # 进程池模式下排在在途任务之后，保证该页的行都已写出
+                    if pool:
+                        pending.append((page_idx, i, record, None, None))
+                    else:
+                        self._page_done(page_idx, record)
+                    continue
+                if pool:
+                    pending.append((page_idx, i, record, html, self._submit(pool, record, html)))
+                    while len(pending) > max_pending:
+                        self._merge(*pending.popleft())
+                    continue
+                try:
+                    self._emit(page_idx, i, self.spider.build_rows(record, html))
+                except Exception as e:
+                    self.spider._log(f"解析异常 {record.get('id')}: {e}")
+            while pending:
+                self._merge(*pending.popleft())
+        except Exception as e:
+            # 解析线程退出前继续消费队列，上游不会在 put 处永久阻塞
+            self._fail("解析", e)
+            self._drain(self.html_q)
+
+    def _submit(self, pool, record, html):
+        try:
+            return pool.submit(html)
+        except Exception as e:
+            # 进程池不可用 (如 BrokenProcessPool 且重建失败) 时该条改在本线程解析
+            self.spider._log(f"解析进程池提交失败 {record.get('id')}: {e}，改在本线程解析")
+            return None
+
+    def _merge(self, page_idx, i, record, html, future):
+        if i is _PAGE_END:
+            self._page_done(page_idx, record)
+            return
+        try:
+            if future is None:
+                rows = self.spider.build_rows(record, html)
+            else:
+                try:
+                    child_rows = future.result()
+                except BrokenProcessPool as e:
+                    self.spider._log(f"解析进程池异常 {record.get('id')}: {e}，改在本线程解析")
+                    child_rows = self.spider.parse_html_table(html)
+                except Exception as e:
+                    self.spider._log(f"解析异常 {record.get('id')}: {e}")
+                    child_rows = []
+                rows = self.spider.merge_rows(record, child_rows)
+            self._emit(page_idx, i, rows)
+        except Exception as e:
+            self.spider._log(f"写出异常 {record.get('id')}: {e}")
+
+    def _fail(self, stage, e):
+        if self.error is None:
+            self.error = e
+        self.spider._log(f"{stage}阶段异常退出: {e}")
+
+    @staticmethod
+    def _drain(q):
+        while q.get() is not _DONE:
+            pass
+
+    def _emit(self, page_idx, i, rows):
+        # 解析阶段按 页码、行序 顺序消费，流式写出时顺序与收集模式一致
+        self.spider.progress["rows"] += len(rows)
+        if self.on_page:
+            self.page_rows.setdefault(page_idx, []).extend(rows)
+        if self.on_rows:
+            self.on_rows(rows)
+        else:
+            self.results[(page_idx, i)] = rows
+
+    def _page_done(self, page_idx, records):
+        rows = self.page_rows.pop(page_idx, [])
+        if self.on_page:
+            try:
+                self.on_page(page_idx, records, rows)
+            except Exception as e:
+                self.spider._log(f"第 {page_idx} 页断点写入异常: {e}")
+
+    def run(self, pages):
+        """
+        消费 (页码, records) 生成器，返回按页码、行序排列的全部数据行；
+        流式模式 (on_rows) 下返回空列表。
+        """
+        detail_t = threading.Thread(target=self._detail_stage, daemon=True)
+        parse_t = threading.Thread(target=self._parse_stage, daemon=True)
+        detail_t.start()
+        parse_t.start()
+
+        try:
+            for page_idx, records in pages:
+                if self.error is not None:
+                    break
+                self.spider.progress["pages"] += 1
+                self.page_q.put((page_idx, records))
+        except Exception as e:
+            # 列表阶段出错时保留已完成的数据，并记录异常供调用方判断任务是否完整
+            self.spider.last_error = str(e)
+            self.spider._log(f"爬虫运行异常: {e}")
+        finally:
+            self.page_q.put(_DONE)
+            detail_t.join()
+            parse_t.join()
+        if self.error is not None:
+            raise self.error
+
+        all_data = []
+        for key in sorted(self.results):
+            all_data.extend(self.results[key])
+        return all_data
@@ -0,0 +1,106 @@
+import threading
+import time
+
+
+class TokenBucket(object):
+    """
+    线程安全的令牌桶：rate 为每秒补充的令牌数，burst 为桶容量。
+    acquire_delay() 只预订令牌并返回需要等待的秒数，由调用方自行 sleep (同步或 asyncio)。
+    """
+
+    def __init__(self, rate, burst=1):
+        self.rate = float(rate)
+        self.burst = float(burst)
+        self.tokens = float(burst)
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def _refill(self, now):
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def set_rate(self, rate):
+        with self.lock:
+            self._refill(time.monotonic())
+            self.rate = float(rate)
+
+    def acquire_delay(self):
+        with self.lock:
+            now = time.monotonic()
+            self._refill(now)
+            self.tokens -= 1
+            if self.tokens >= 0:
+                return 0.0
+            # 令牌被预支，按缺口计算等待时间
+            return -self.tokens / self.rate
+
+    def acquire(self):
+        delay = self.acquire_delay()
+        if delay > 0:
+            time.sleep(delay)
+        return delay
+
+
+class AimdController(object):
+    """
+    AIMD (加性增、乘性减) 速率与并发控制。
+    - 成功且延迟正常: 速率 +rate_step，并发每满一"窗口"成功数 +1
+    - 403/429 拦截: 速率、并发减半，并进入冷却期 (冷却期内不再加速)
+    - 5xx 或延迟超过阈值: 温和回退 (x0.75)
+    """
+
+    def __init__(self, rate=0.5, min_rate=0.1, max_rate=5.0, rate_step=0.05,
+                 concurrency=2, min_concurrency=1, max_concurrency=8,
+                 latency_threshold=3.0, cooldown=30.0):
+        self.min_rate = min_rate
+        self.max_rate = max_rate
+        self.rate_step = rate_step
+        self.min_concurrency = min_concurrency
+        self.max_concurrency = max_concurrency
+        self.latency_threshold = latency_threshold
+        self.cooldown = cooldown
+
+        self.bucket = TokenBucket(rate, burst=1)
+        self.concurrency = concurrency
+        self._window_successes = 0
+        self._cooldown_until = 0.0
+        self.lock = threading.Lock()
+
+        self.stats = {"ok": 0, "blocked": 0, "server_error": 0, "slow": 0, "error": 0}
+
+    @property
+    def rate(self):
+        return self.bucket.rate
+
+    def _set_rate(self, rate):
+        self.bucket.set_rate(min(self.max_rate, max(self.min_rate, rate)))
+
+    def _decrease(self, factor, now):
+        self._set_rate(self.rate * factor)
+        self.concurrency = max(self.min_concurrency, int(self.concurrency * factor))
+        self._window_successes = 0
+        self._cooldown_until = now + self.cooldown
+
+    def on_result(self, status, latency):
+        """
+        status: ok / blocked (403/429) / server_error (5xx) / error (网络异常、解码失败等)
+        """
+        now = time.monotonic()
+        with self.lock:
+            if status == "ok" and latency > self.latency_threshold:
+                status = "slow"
+            self.stats[status] = self.stats.get(status, 0) + 1
+
+            if status == "blocked":
+                self._decrease(0.5, now)
+            elif status in ("server_error", "slow"):
+                self._decrease(0.75, now)
+            elif status == "ok" and now >= self._cooldown_until:
+                self._set_rate(self.rate + self.rate_step)
+                self._window_successes += 1
+                if self._window_successes >= self.concurrency:
+                    self._window_successes = 0
+                    self.concurrency = min(self.max_concurrency, self.concurrency + 1)
+
+    def summary(self):
+        return f"速率 {self.rate:.2f} 次/秒, 并发 {self.concurrency}, 统计 {self.stats}"
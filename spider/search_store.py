@@ -0,0 +1,268 @@
+import sqlite3
+import time
+
+from spider.dedup_index import row_fingerprint
+from spider.normalize import normalize_rows, to_records
+from spider.storage import SQLiteStore
+
+# 导出行字段 -> 表列名
+ROW_COLUMNS = {
+    "地区": "region",
+    "标题": "title",
+    "发布人": "publisher",
+    "采购方式": "buy_kind",
+    "项目类型": "project_type",
+    "发布时间": "date",
+    "子序号": "sub_no",
+    "采购项目名称": "project_name",
+    "采购需求概况": "summary",
+    "预算金额(万元)": "budget_text",
+    "拟面向中小企业预留": "sme",
+    "预计采购时间": "plan_time",
+    "备注": "remark",
+    "Link": "link",
+}
+
+# 全文检索的列
+FTS_COLUMNS = ("title", "project_name", "summary")
+
+# trigram 分词按 3 字切分，更短的关键词走 LIKE
+MIN_FTS_TERM = 3
+
+# 预聚合的分组维度 (参数名 -> 列名)
+AGGREGATE_DIMENSIONS = {"region": "region", "month": "month", "project_type": "project_type"}
+
+
+class SearchStore(SQLiteStore):
+    """
+    已爬取意向的本地检索库 (SQLite WAL)，分析查询直接查本地，不必重新爬取。
+    - FTS5 (trigram 分词，支持中文子串) 索引 标题 / 采购项目名称 / 采购需求概况
+    - B-tree 索引 地区代码 / 地区 / 发布时间 / 预算金额，结果按 (发布时间, id) 倒序做 keyset 分页
+    - 按子行指纹去重，重复爬取同一行不会重复入库
+    - 入库前整批向量化规范化 (预算金额 -> 万元、预计采购时间 -> 月份)，
+      同一事务内增量更新 地区 / 发布月份 / 项目类型 的预算汇总，看板查询不必扫描明细
+    - 写入按 batch_size 行攒批，任务结束时 flush()
+    写操作共用一个连接并加锁；读操作每个线程一个连接。
+    """
+
+    def __init__(self, path="cache/search.sqlite3", batch_size=200):
+        super().__init__(path)
+        self.batch_size = batch_size
+        self.pending = []
+        columns = ",\n".join(f"                {name} TEXT" for name in ROW_COLUMNS.values())
+        self.writer.executescript(f"""
+            CREATE TABLE IF NOT EXISTS intentions (
+                id INTEGER PRIMARY KEY,
+                fingerprint TEXT NOT NULL UNIQUE,
+                area TEXT NOT NULL,
+{columns},
+                budget REAL,
+                plan_month TEXT,
+                crawled_at REAL NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS aggregates (
+                region TEXT NOT NULL,
+                month TEXT NOT NULL,
+                project_type TEXT NOT NULL,
+                budget_total REAL NOT NULL,
+                budget_rows INTEGER NOT NULL,
+                row_count INTEGER NOT NULL,
+                PRIMARY KEY (region, month, project_type)
+            );
+            CREATE INDEX IF NOT EXISTS idx_intentions_date ON intentions(date, id);
+            CREATE INDEX IF NOT EXISTS idx_intentions_area ON intentions(area, date, id);
+            CREATE INDEX IF NOT EXISTS idx_intentions_region ON intentions(region, date, id);
+            CREATE INDEX IF NOT EXISTS idx_intentions_budget ON intentions(budget);
+        """)
+        # 旧版检索库没有 plan_month 列和预聚合表
+        columns = [row[1] for row in self.writer.execute("PRAGMA table_info(intentions)")]
+        if "plan_month" not in columns:
+            self.writer.execute("ALTER TABLE intentions ADD COLUMN plan_month TEXT")
+        if not self.writer.execute("SELECT 1 FROM aggregates LIMIT 1").fetchone():
+            self._backfill()
+        # 旧版 SQLite 没有 trigram 分词器时退回 LIKE 查询
+        try:
+            self.writer.executescript(f"""
+                CREATE VIRTUAL TABLE IF NOT EXISTS intentions_fts USING fts5(
+                    {", ".join(FTS_COLUMNS)}, content='intentions', content_rowid='id', tokenize='trigram'
+                );
+                CREATE TRIGGER IF NOT EXISTS intentions_ai AFTER INSERT ON intentions BEGIN
+                    INSERT INTO intentions_fts(rowid, {", ".join(FTS_COLUMNS)})
+                    VALUES (new.id, {", ".join("new." + c for c in FTS_COLUMNS)});
+                END;
+            """)
+            self.fts = True
+        except sqlite3.OperationalError:
+            self.fts = False
+        self.writer.commit()
+
+    # ---- 写 ----
+
+    def add_rows(self, rows, area=""):
+        """登记导出的行 (area 为爬取时的地区代码)；攒够 batch_size 行后整批入库"""
+        if not rows:
+            return
+        with self.write_lock:
+            self.pending.extend(dict(row, _area=area) for row in rows)
+            if len(self.pending) >= self.batch_size:
+                self._write_pending()
+
+    def flush(self):
+        with self.write_lock:
+            self._write_pending()
+
+    def _write_pending(self):
+        rows, self.pending = self.pending, []
+        if not rows:
+            return
+        frame = normalize_rows(rows)
+        frame["fingerprint"] = [row_fingerprint(row) for row in rows]
+        frame = frame.drop_duplicates("fingerprint")
+        # 已入库的行不再写入，也不再计入汇总
+        existing = set()
+        fingerprints = frame["fingerprint"].tolist()
+        for i in range(0, len(fingerprints), 500):
+            chunk = fingerprints[i:i + 500]
+            existing.update(fp for (fp,) in self.writer.execute(
+                f"SELECT fingerprint FROM intentions WHERE fingerprint IN ({', '.join('?' * len(chunk))})", chunk
+            ))
+        frame = frame[~frame["fingerprint"].isin(existing)]
+        if frame.empty:
+            return
+
+        names = list(ROW_COLUMNS.values())
+        for key, column in ROW_COLUMNS.items():
+            frame[column] = frame[key].fillna("").astype(str) if key in frame else ""
+        frame["date"] = frame["date"].str.slice(0, 10)
+        frame["crawled_at"] = time.time()
+        columns = ["fingerprint", "_area"] + names + ["budget", "plan_month", "crawled_at"]
+
+        self.writer.executemany(
+            f"INSERT INTO intentions (fingerprint, area, {', '.join(names)}, budget, plan_month, crawled_at) "
+            f"VALUES ({', '.join('?' * len(columns))})", to_records(frame, columns)
+        )
+        self._add_aggregates(frame)
+        self.writer.commit()
+
+    def _add_aggregates(self, frame):
+        """按 地区 / 发布月份 / 项目类型 汇总一批规范化后的行 (向量化 groupby)，累加到预聚合表"""
+        frame = frame.assign(month=frame["publish_month"].fillna(""))
+        grouped = frame.groupby(["region", "month", "project_type"]).agg(
+            budget_total=("budget", "sum"), budget_rows=("budget", "count"), row_count=("budget", "size")
+        ).reset_index()
+        self.writer.executemany("""
+            INSERT INTO aggregates (region, month, project_type, budget_total, budget_rows, row_count)
+            VALUES (?, ?, ?, ?, ?, ?)
+            ON CONFLICT (region, month, project_type) DO UPDATE SET
+                budget_total = budget_total + excluded.budget_total,
+                budget_rows = budget_rows + excluded.budget_rows,
+                row_count = row_count + excluded.row_count
+        """, to_records(grouped, ["region", "month", "project_type", "budget_total", "budget_rows", "row_count"]))
+
+    def _backfill(self, chunk_size=5000):
+        """
+        旧版检索库升级：已入库的行分批重新走 normalize_rows，
+        更新 budget / plan_month 并重建预聚合表，与新写入的行口径一致 (不在 SQL 里另写一套规则)。
+        """
+        last_id = 0
+        while True:
+            rows = self.writer.execute(
+                "SELECT id, region, project_type, date, budget_text, plan_time FROM intentions "
+                "WHERE id > ? ORDER BY id LIMIT ?", (last_id, chunk_size)
+            ).fetchall()
+            if not rows:
+                break
+            last_id = rows[-1]["id"]
+            frame = normalize_rows([
+                {"id": row["id"], "region": row["region"] or "", "project_type": row["project_type"] or "",
+                 "发布时间": row["date"], "预算金额(万元)": row["budget_text"], "预计采购时间": row["plan_time"]}
+                for row in rows
+            ])
+            self.writer.executemany(
+                "UPDATE intentions SET budget = ?, plan_month = ? WHERE id = ?",
+                to_records(frame, ["budget", "plan_month", "id"])
+            )
+            self._add_aggregates(frame)
+
+    # ---- 读 ----
+
+    def search(self, q="", area="", region="", start_date="", end_date="",
+               min_budget=None, max_budget=None, limit=20, cursor=""):
+        """
+        按关键词 (空格分隔，全部命中) 与筛选条件查询，按发布时间倒序。
+        cursor 为上一页返回的 next_cursor ("发布时间|id")，用于 keyset 分页；格式不对时抛出 ValueError。
+        """
+        started = time.perf_counter()
+        limit = max(1, min(limit, 100))
+        where, params = [], []
+        fts_terms = []
+        for term in q.split():
+            if self.fts and len(term) >= MIN_FTS_TERM:
+                fts_terms.append('"' + term.replace('"', '""') + '"')
+            else:
+                like = "%" + term.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_") + "%"
+                where.append("(" + " OR ".join(f"i.{c} LIKE ? ESCAPE '\\'" for c in FTS_COLUMNS) + ")")
+                params.extend([like] * len(FTS_COLUMNS))
+        if fts_terms:
+            where.append("i.id IN (SELECT rowid FROM intentions_fts WHERE intentions_fts MATCH ?)")
+            params.append(" AND ".join(fts_terms))
+        for column, op, value in (("area", "=", area), ("region", "=", region),
+                                  ("date", ">=", start_date), ("date", "<=", end_date)):
+            if value:
+                where.append(f"i.{column} {op} ?")
+                params.append(value)
+        if min_budget is not None:
+            where.append("i.budget >= ?")
+            params.append(min_budget)
+        if max_budget is not None:
+            where.append("i.budget <= ?")
+            params.append(max_budget)
+        if cursor:
+            date, sep, last_id = cursor.rpartition("|")
+            if not sep or not last_id.isdigit():
+                raise ValueError(f"无效的 cursor: {cursor}")
+            where.append("(i.date, i.id) < (?, ?)")
+            params.extend([date, int(last_id)])
+
+        sql = "SELECT i.* FROM intentions i"
+        if where:
+            sql += " WHERE " + " AND ".join(where)
+        sql += " ORDER BY i.date DESC, i.id DESC LIMIT ?"
+        rows = self._reader().execute(sql, params + [limit + 1]).fetchall()
+
+        items = [{key: row[column] for key, column in ROW_COLUMNS.items()} for row in rows[:limit]]
+        for item, row in zip(items, rows):
+            item["预算金额"] = row["budget"]
+            item["预计采购月份"] = row["plan_month"]
+        next_cursor = f"{rows[limit - 1]['date']}|{rows[limit - 1]['id']}" if len(rows) > limit else None
+        return {
+            "items": items,
+            "next_cursor": next_cursor,
+            "took_ms": round((time.perf_counter() - started) * 1000, 2)
+        }
+
+    def aggregates(self, group_by=("region", "month", "project_type"), region="", project_type="",
+                   start_month="", end_month=""):
+        """
+        从预聚合表读取预算汇总 (万元)，group_by 为 region / month / project_type 的任意组合，
+        不扫描明细行。
+        """
+        dims = [AGGREGATE_DIMENSIONS[d] for d in group_by if d in AGGREGATE_DIMENSIONS]
+        where, params = [], []
+        for column, op, value in (("region", "=", region), ("project_type", "=", project_type),
+                                  ("month", ">=", start_month), ("month", "<=", end_month)):
+            if value:
+                where.append(f"{column} {op} ?")
+                params.append(value)
+        sql = ("SELECT " + "".join(f"{d}, " for d in dims)
+               + "SUM(budget_total) AS budget_total, SUM(budget_rows) AS budget_rows, SUM(row_count) AS row_count "
+               + "FROM aggregates")
+        if where:
+            sql += " WHERE " + " AND ".join(where)
+        if dims:
+            sql += " GROUP BY " + ", ".join(dims) + " ORDER BY " + ", ".join(dims)
+        rows = self._reader().execute(sql, params).fetchall()
+        return [dict(row) for row in rows if row["row_count"]]
+
+    def count(self):
+        return self._reader().execute("SELECT COUNT(*) FROM intentions").fetchone()[0]
@@ -1,16 +1,52 @@
 import requests
 import json
 import base64
-import time
-from bs4 import BeautifulSoup
 import pandas as pd
 import threading
 from concurrent.futures import ThreadPoolExecutor
 
-import random
+import datetime
+import re
+
+from spider.http_session import build_session, build_headers
+from spider.rate_control import AimdController
+from spider.detail_fetcher import AsyncDetailFetcher
+from spider.pipeline import CrawlPipeline
+from spider.table_parser import PARSERS
+from spider.parse_pool import ParsePool
+from spider.waits import PolitenessScheduler, WaitReport, host_of
+
+# get_list 返回的 pages 特殊值
+LIST_BLOCKED = -1   # 403/429/5xx，应立即停止
+LIST_CAPTCHA = -2   # 接口要求验证码，需要用浏览器重新过验证码
+
+# 快捷时间范围代码 -> 天数 (与网页上的快捷按钮一致)
+QUICK_TIME_DAYS = {"0": 0, "7": 7, "30": 30, "180": 180, "365": 365, "1095": 1095}
+
+
+def resolve_time_range(start_time, end_time):
+    """把快捷时间代码 ("30" 等) 转换成接口需要的 YYYY-MM-DD 日期区间"""
+    if start_time in QUICK_TIME_DAYS:
+        today = datetime.date.today()
+        start = today - datetime.timedelta(days=QUICK_TIME_DAYS[start_time])
+        return start.isoformat(), today.isoformat()
+    return start_time, end_time
+
+
+# getDetail 响应中公告头部信息的候选字段名 (记录字段 -> 接口字段)
+DETAIL_META_FIELDS = {
+    "publisher": ("publisher", "userName", "releaseUser", "createUserName", "author"),
+    "title": ("title",),
+    "date": ("releaseTime", "publishTime", "createTime"),
+    "areaName": ("areaName",),
+}
+
 
 class Shandong(object):
-    def __init__(self, use_proxy=False):
+    def __init__(self, use_proxy=False, detail_workers=2, max_detail_workers=8, detail_engine="aimd", detail_cache=None,
+                 watermark_store=None, parser="lxml", parse_processes=None, browser_pool=None, politeness=None,
+                 rate_controller=None, parse_pool=None, dedup_index=None, new_only=False,
+                 search_store=None):
         self.list_url = "http://www.ccgp-shandong.gov.cn:8087/api/website/site/getListByCode"
         self.detail_url = "http://www.ccgp-shandong.gov.cn:8087/api/website/site/getDetail"
         self.user_agents = [
@@ -29,6 +65,54 @@ class Shandong(object):
             }
         
         self.log_func = None
+        self.browser = None
+        # 浏览器池 (BrowserPool)，为 None 时每次任务新建浏览器且不关闭 (Debug 模式)
+        self.browser_pool = browser_pool
+        # 进度计数 (列表页数 / 详情记录数 / 导出行数)，由流水线更新
+        self.progress = {"pages": 0, "records": 0, "rows": 0}
+        # 按主机的礼貌延迟 (可由多个任务共享)，以及本任务的等待耗时统计 (页面就绪 / 礼貌延迟)
+        self.politeness = politeness or PolitenessScheduler()
+        self.wait_report = WaitReport()
+        self.api_host = host_of(self.list_url)
+        # 本次 run() 的结果：列表是否正常翻到最后一页 (未被拦截 / 验证码中断)、是否翻满了页数上限、运行异常信息
+        self.list_completed = False
+        self.page_limit_reached = False
+        self.last_error = None
+        # API 会话是否已带上过验证码后的 Cookies (可由其他爬虫实例共享，避免重复过验证码)
+        self.api_session_ready = False
+        
+        # 详情页初始并发数 / AIMD 并发上限，上限同时决定连接池大小
+        self.detail_workers = detail_workers
+        self.max_detail_workers = max(detail_workers, max_detail_workers)
+        # 详情页引擎: "aimd" = asyncio + 自适应限速; "threads" = 固定线程池 + 礼貌延迟
+        self.detail_engine = detail_engine
+        # AIMD 限速器，可由多个爬虫共享 (多地区任务共用一个详情速率预算)；为 None 时首次抓详情时创建
+        self.rate_controller = rate_controller
+        # 详情页本地缓存 (DetailCache)，为 None 时不使用缓存
+        self.detail_cache = detail_cache
+        self.cache_hits = 0
+        self.cache_misses = 0
+        # getDetail 响应中的元数据 (发布人等)，按 id 暂存，merge_rows 时补进记录
+        self.detail_meta = {}
+        # 详情表格解析后端: "lxml" / "bs4"
+        self.parser = parser
+        # 解析进程数: None = CPU 核数, 0 = 不用进程池 (在详情线程内解析)
+        self.parse_processes = parse_processes
+        # 外部传入的解析进程池 (服务端所有任务共享，由调用方关闭)；为 None 时 run() 自行创建并关闭 (独立运行 / 基准测试)
+        self.parse_pool = parse_pool
+        self.own_parse_pool = False
+        # 增量爬取水位线存储 (WatermarkStore)，run(incremental=True) 时使用
+        self.watermark_store = watermark_store
+        # 跨任务去重索引 (DedupIndex)：写出的行都会登记；new_only=True 时跳过已知公告与已知子行
+        self.dedup_index = dedup_index
+        self.new_only = new_only and dedup_index is not None
+        self.dedup_skipped = {"announcements": 0, "rows": 0}
+        # 本次详情抓取失败 (只写出兜底行) 的公告链接，不登记为已导出公告
+        self.detail_failed = set()
+        # 本地检索库 (SearchStore)：写出的行同时入库，供 /api/search 查询
+        self.search_store = search_store
+        # 复用 keep-alive 连接、Cookies 与请求头，避免每个详情页都重新握手
+        self.session = build_session(self.user_agents, pool_size=self.max_detail_workers, proxies=self.proxies)
         
         # 仅在启用代理时检查状态
         if self.use_proxy:
@@ -75,17 +159,8 @@ class Shandong(object):
             print(msg)
 
     def get_headers(self):
-        return {
-            "accept": "application/json, text/plain, */*",
-            # "accept-encoding": "gzip, deflate", # requests usually handles this
-            "accept-language": "zh-CN,zh;q=0.9",
-            "connection": "keep-alive",
-            "content-type": "application/json;charset=UTF-8",
-            "host": "www.ccgp-shandong.gov.cn:8087",
-            "origin": "http://www.ccgp-shandong.gov.cn",
-            "referer": "http://www.ccgp-shandong.gov.cn/",
-            "user-agent": random.choice(self.user_agents)
-        }
+        return build_headers(self.user_agents)
+
     def get_list(self, page, title="", start_time="", end_time="", area="370000"):
         # Date format must be YYYY-MM-DD HH:mm:ss
         if start_time and len(start_time) == 10:
@@ -110,207 +185,157 @@ class Shandong(object):
         }
         try:
             self._log(f"正在请求列表页: 第 {page} 页 (地区: {area}, 搜索词: {title})")
-            # 严格反爬：列表页请求前随机休眠 2-5 秒
-            time.sleep(random.uniform(2.0, 5.0))
+            # 严格反爬：列表页请求前按主机的礼貌延迟排队
+            self.politeness.wait(self.api_host, self.wait_report)
             
-            resp = requests.post(self.list_url, json=data, headers=self.get_headers(), timeout=20, proxies=self.proxies)
+            resp = self.session.post(self.list_url, json=data, timeout=20)
             
             # 状态码监控
             if resp.status_code in [403, 429]:
                 self._log("🔥 警告: 触发服务器拦截 (403/429)，立即停止爬取以保护 IP！")
-                return [], -1
+                return [], LIST_BLOCKED
             elif resp.status_code >= 500:
                 self._log(f"🔥 警告: 目标服务器过载或出错 (错误码: {resp.status_code})，停止爬取，避免加重负担！")
-                return [], -1
+                return [], LIST_BLOCKED
                 
             if resp.status_code == 200:
-                j = resp.json()
-                # Assuming structure: j['data']['data']['records'] based on investigation
-                # But test_api.py output showed j['data']['data'] has 'records'
-                # Let's handle both just in case or stick to what we saw.
-                if j.get("data") and j["data"].get("data") and j["data"]["data"].get("records"):
-                    return j["data"]["data"]["records"], j["data"]["data"].get("pages", 0)
-                else:
-                    self._log("Debug - API JSON structure: " + json.dumps(j, indent=2, ensure_ascii=False))
+                return self.parse_list_response(resp.json(), resp.text)
             else:
                 self._log(f"List error page {page}, status {resp.status_code}: {resp.text}")
         except Exception as e:
             self._log(f"List exception page {page}: {e}")
         return [], 0
 
-    def get_detail_html(self, id_val, colCode):
+    def parse_list_response(self, j, text=""):
+        """
+        解析 getListByCode 响应 JSON，返回 (records, 总页数)；接口要求验证码时总页数为 LIST_CAPTCHA。
+        接口直连 (get_list) 与浏览器抓包 (iter_network_pages) 共用。
+        """
+        # Assuming structure: j['data']['data']['records'] based on investigation
+        # But test_api.py output showed j['data']['data'] has 'records'
+        # Let's handle both just in case or stick to what we saw.
+        if j.get("data") and j["data"].get("data") and j["data"]["data"].get("records"):
+            return j["data"]["data"]["records"], j["data"]["data"].get("pages", 0)
+        elif "验证码" in text or "captcha" in text.lower():
+            self._log("列表接口要求验证码")
+            return [], LIST_CAPTCHA
+        else:
+            self._log("Debug - API JSON structure: " + json.dumps(j, indent=2, ensure_ascii=False))
+        return [], 0
+
+    def fetch_detail(self, id_val, colCode, old_data=0):
+        """
+        请求详情接口 (不休眠)，返回 (html, status)。
+        status: ok / blocked (403/429) / server_error (5xx) / error，供限速器调节速率。
+        """
         params = {
             "id": id_val,
             "colCode": colCode,
-            "oldData": 0
+            "oldData": old_data
         }
         try:
-            # 严格反爬：详情页请求前随机休眠 2-5 秒
-            time.sleep(random.uniform(2.0, 5.0))
-            resp = requests.get(self.detail_url, params=params, headers=self.get_headers(), timeout=20, proxies=self.proxies)
+            resp = self.session.get(self.detail_url, params=params, timeout=20)
             
             if resp.status_code in [403, 429]:
-                self._log(f"🔥 详情页 {id_val} 触发拦截，跳过...")
-                return None
+                self._log(f"🔥 详情页 {id_val} 触发拦截 ({resp.status_code})")
+                return None, "blocked"
+            if resp.status_code >= 500:
+                self._log(f"🔥 详情页 {id_val} 服务器出错 (错误码: {resp.status_code})")
+                return None, "server_error"
                 
             if resp.status_code == 200:
                 j = resp.json()
                 if j.get("data") and j["data"].get("data") and j["data"]["data"].get("body"):
-                    body = j["data"]["data"]["body"]
+                    detail = j["data"]["data"]
+                    body = detail["body"]
                     try:
-                        return base64.b64decode(body).decode('utf-8')
+                        html = base64.b64decode(body).decode('utf-8')
                     except:
                         try:
-                            return base64.b64decode(body).decode('gb18030')
+                            html = base64.b64decode(body).decode('gb18030')
                         except:
-                            return None
+                            return None, "error"
+                    self.detail_meta[str(id_val)] = self.parse_detail_meta(detail, html)
+                    return html, "ok"
+                return None, "ok"
         except Exception as e:
             self._log(f"Detail exception {id_val}: {e}")
-        return None
+        return None, "error"
 
-    def parse_html_table(self, html):
+    def parse_detail_meta(self, detail, html):
         """
-        [V3.1] 终极解析方案：自动纠错与去重 (Fixed)
-        1. 必须包含 '序号' 列才视为有效清单表。
-        2. 使用 recursive=False 并支持 tbody 查找。
-        3. 智能列偏移校正：检测到“序号”列由长文本占据时，自动触发 Left-Shift 修正。
-        4. 全局去重：防止同一项目被多次提取。
+        从 getDetail 响应提取公告头部信息 (发布人 / 标题 / 发布时间 / 地区)，键名与记录字段一致。
+        优先取 JSON 字段，发布人缺失时再从正文中匹配 "发布人：xxx"。
         """
-        if not html:
-            return []
-        soup = BeautifulSoup(html, 'lxml')
-        tables = soup.find_all('table')
-        results = []
-        seen_titles = set()
-        
-        self._log(f"Debug: Found {len(tables)} tables")
-        
-        for table_idx, table in enumerate(tables):
-            # 优先查找直接子节点 tr，若无则查找 tbody 下的 tr
-            rows = table.find_all('tr', recursive=False)
-            if len(rows) < 2: 
-                tbody = table.find('tbody', recursive=False)
-                if tbody:
-                    rows = tbody.find_all('tr', recursive=False)
-            
-            if len(rows) < 2: 
-                continue
-            
-            # 1. 精确寻找表头行
-            header_row_idx = -1
-            col_map = {
-                "sub_index": -1, "project_name": -1, "desc": -1, 
-                "amount": -1, "sme_reserve": -1, "est_time": -1, "remark": -1
-            }
-            
-            # 搜索前 6 行寻找表头
-            for idx, tr in enumerate(rows[:6]):
-                cells = tr.find_all(['td', 'th'], recursive=False)
-                headers = [c.get_text(strip=True) for c in cells]
-                
-                temp_map = {k: -1 for k in col_map}
-                for i, h in enumerate(headers):
-                    if "序号" in h: temp_map["sub_index"] = i
-                    elif "名称" in h: temp_map["project_name"] = i
-                    elif "概况" in h or "需求" in h: temp_map["desc"] = i
-                    elif "金额" in h: temp_map["amount"] = i
-                    elif "中小企业" in h: temp_map["sme_reserve"] = i
-                    elif "时间" in h: temp_map["est_time"] = i
-                    elif "备注" in h: temp_map["remark"] = i
-                
-                # 严格标准：必须找到“序号”和“项目名称”才视为有效表头
-                if temp_map["sub_index"] != -1 and temp_map["project_name"] != -1:
-                    header_row_idx = idx
-                    col_map = temp_map
+        meta = {}
+        for key, candidates in DETAIL_META_FIELDS.items():
+            for name in candidates:
+                value = detail.get(name)
+                if value:
+                    meta[key] = str(value).strip()
                     break
-            
-            if header_row_idx == -1:
-                continue
+        if not meta.get("publisher") and html:
+            match = re.search(r"发布人[：:]\s*([^<\s]+)", html)
+            if match:
+                meta["publisher"] = match.group(1)
+        return meta
 
-            # 2. 从表头下一行开始遍历数据
-            for row in rows[header_row_idx+1:]:
-                cols = row.find_all(['td', 'th'], recursive=False)
-                if len(cols) < 2: continue
-                
-                def get_clean_text(idx):
-                    if idx != -1 and idx < len(cols):
-                        txt = cols[idx].get_text(" ", strip=True) # 使用空格连接标签内容
-                        txt = txt.replace("\n", " ").replace("\r", " ").replace("\t", " ")
-                        while "  " in txt: 
-                            txt = txt.replace("  ", " ")
-                        return txt.strip()
-                    return ""
-
-                # 提取原始数据
-                raw_idx_val = get_clean_text(col_map["sub_index"])
-                raw_name_val = get_clean_text(col_map["project_name"])
-                
-                # 3. 智能错位修正 (Data Shift Correction)
-                is_shifted = False
-                # 如果序号列内容长度超过5且不是纯数字，极有可能是项目名称挤占了序号列
-                if len(raw_idx_val) > 5 and not raw_idx_val.isdigit():
-                    is_shifted = True
-                
-                item = {}
-                if is_shifted:
-                    # 错位处理：物理列重映射
-                    # 假定物理顺序列：[Name, Desc, Amount, SME, Time, Remark] (Index丢失)
-                    # 强制按物理顺序读取
-                    phy_cols = [c.get_text(" ", strip=True).replace("\n","").replace("\r","").strip() for c in cols]
-                    # 清洗物理列中的多余空格
-                    phy_cols = [" ".join(p.split()) for p in phy_cols]
-                    while len(phy_cols) < 7: phy_cols.append("")
-                    
-                    item = {
-                        "子序号": "", 
-                        "采购项目名称": phy_cols[0],
-                        "采购需求概况": phy_cols[1],
-                        "预算金额(万元)": phy_cols[2],
-                        "拟面向中小企业预留": phy_cols[3],
-                        "预计采购时间": phy_cols[4],
-                        "备注": phy_cols[5] if len(phy_cols)>5 else ""
-                    }
-                else:
-                    # 正常映射
-                    item = {
-                        "子序号": raw_idx_val,
-                        "采购项目名称": raw_name_val,
-                        "采购需求概况": get_clean_text(col_map["desc"]),
-                        "预算金额(万元)": get_clean_text(col_map["amount"]),
-                        "拟面向中小企业预留": get_clean_text(col_map["sme_reserve"]),
-                        "预计采购时间": get_clean_text(col_map["est_time"]),
-                        "备注": get_clean_text(col_map["remark"])
-                    }
-
-                # 4. 有效性校验
-                if not item["采购项目名称"] or item["采购项目名称"] in ["采购项目名称", "项目名称", "名称"]:
-                    continue
-                
-                # 5. 全局去重 (使用 项目名称+金额 作为指纹)
-                unique_key = item["采购项目名称"] + item["预算金额(万元)"]
-                if unique_key in seen_titles:
-                    continue
-                seen_titles.add(unique_key)
-
-                results.append(item)
-                    
-        return results
-
-    def process_item(self, record):
-        # record 包含列表页字段: id, title, userName, areaName, date, buyKindCode...
-        full_link = f"http://www.ccgp-shandong.gov.cn/detail?id={record['id']}&colCode={record['colCode']}&oldData={record['oldData']}"
-        self._log(f"[{record.get('areaName', '未知')}] 解析中: {record.get('title', '无标题')}")
-        
-        html = self.get_detail_html(record['id'], record['colCode'])
-        child_rows = self.parse_html_table(html)
-        
+    def apply_detail_meta(self, record):
+        """用详情元数据补齐记录中缺失的字段 (列表页已有的不覆盖)"""
+        meta = self.detail_meta.pop(str(record['id']), None)
+        if meta:
+            for key, value in meta.items():
+                if value and not record.get(key):
+                    record[key] = value
+
+    def normalize_api_record(self, record):
+        """
+        把 getListByCode 返回的记录补齐成与 BrowserEngine.extract_records 相同的字段，
+        以便流水线的详情 / 解析阶段通用。
+        """
+        rec = dict(record)
+        rec["id"] = str(rec.get("id", ""))
+        rec.setdefault("colCode", self.colCode)
+        if rec.get("oldData") is None:
+            rec["oldData"] = 0
+        rec.setdefault("publisher", rec.get("userName", ""))
+        rec.setdefault("projectType", rec.get("projectTypeName", ""))
+        if rec.get("buyKindName"):
+            rec["buyKindCode"] = rec["buyKindName"]
+        rec["url"] = self.detail_link(rec)
+        return rec
+
+    def get_detail_html(self, id_val, colCode, old_data=0):
+        # 严格反爬：详情页请求前按主机的礼貌延迟排队 (与列表请求共用同一主机预算)
+        self.politeness.wait(self.api_host, self.wait_report)
+        html, status = self.fetch_detail(id_val, colCode, old_data)
+        return html
+
+    def parse_html_table(self, html):
+        """
+        解析详情页中的采购意向清单表，实现见 spider/table_parser.py。
+        self.parser 选择后端: "lxml" (默认，快) 或 "bs4" (原始实现)，两者输出一致。
+        """
+        return PARSERS[self.parser](html, log=self._log)
+
+    def build_rows(self, record, html):
+        """把详情页 HTML 解析成子行，并与列表页父级字段合并"""
+        return self.merge_rows(record, self.parse_html_table(html))
+
+    def detail_link(self, record):
+        return f"http://www.ccgp-shandong.gov.cn/detail?id={record['id']}&colCode={record['colCode']}&oldData={record['oldData']}"
+
+    def merge_rows(self, record, child_rows):
+        """把解析出的子行与列表页父级字段合并 (One Parent -> Many Children)"""
+        self.apply_detail_meta(record)
+        full_link = self.detail_link(record)
         final_rows = []
         
         # 基础父级字段 (Parent Fields)
         parent_info = {
             "地区": record.get("areaName", ""),
             "标题": record.get("title", ""),
-            "发布人": record.get("publisher", ""),  # 从详情页提取的发布人
+            "发布人": record.get("publisher", ""),  # 列表接口或 getDetail 响应中的发布人
             "采购方式": record.get("buyKindCode", ""), # 若API未返回则由外部填充
             "项目类型": record.get("projectType", ""),
             "发布时间": record.get("date", ""),
@@ -337,98 +362,469 @@ class Shandong(object):
                 "备注": ""
             })
             final_rows.append(row)
-            
+        
+        if self.new_only:
+            fresh = self.dedup_index.new_rows(final_rows)
+            self.dedup_skipped["rows"] += len(final_rows) - len(fresh)
+            return fresh
         return final_rows
 
-    def run(self, max_pages=1, start_page=1, title="", start_time="", end_time="", area="370000"):
-        from spider.browser_engine import BrowserEngine
+    def get_cached_html(self, record):
+        if not self.detail_cache:
+            return None
+        html, meta = self.detail_cache.get(record['id'], record['colCode'], record.get('oldData', 0), with_meta=True)
+        if html is None:
+            self.cache_misses += 1
+        else:
+            self.cache_hits += 1
+            if meta:
+                self.detail_meta[str(record['id'])] = meta
+        return html
+
+    def put_cached_html(self, record, html):
+        if self.detail_cache and html:
+            meta = self.detail_meta.get(str(record['id']))
+            self.detail_cache.put(record['id'], record['colCode'], record.get('oldData', 0), html, meta)
+
+    def fetch_htmls(self, records):
+        """
+        获取一页记录的详情 HTML (不解析)，返回与 records 对齐的列表。
+        先查本地缓存，只对未命中的记录发起请求。
+        """
+        htmls = [self.get_cached_html(rec) for rec in records]
+        missing = [i for i, html in enumerate(htmls) if html is None]
+        if self.detail_cache:
+            self._log(f"详情缓存: 本页命中 {len(records) - len(missing)} / 未命中 {len(missing)}")
         
-        all_data = []
-        self.browser = BrowserEngine(headless=False) # GUI 模式以便通过验证码
-        self.browser.logger = self.log_func # 传递日志函数
+        if missing:
+            fetched = self._fetch_remote_htmls([records[i] for i in missing])
+            for i, html in zip(missing, fetched):
+                htmls[i] = html
+                self.put_cached_html(records[i], html)
+        return htmls
+
+    def _fetch_remote_htmls(self, records):
+        """按 detail_engine 请求详情接口"""
+        if self.detail_engine == "aimd":
+            if self.rate_controller is None:
+                self.rate_controller = AimdController(
+                    concurrency=self.detail_workers, max_concurrency=self.max_detail_workers
+                )
+            htmls = AsyncDetailFetcher(self, self.rate_controller).fetch_all(records)
+            self._log(f"详情页限速器状态: {self.rate_controller.summary()}")
+            return htmls
         
-        try:
-            self.browser.init_driver()
-            
-            # 1. 导航并搜索
-            self.browser.goto_search_page()
-            self.browser.perform_search(title, start_time, end_time, area)
+        def fetch(record):
+            self._log(f"[{record.get('areaName', '未知')}] 解析中: {record.get('title', '无标题')}")
+            return self.get_detail_html(record['id'], record['colCode'], record.get('oldData', 0))
+        
+        with ThreadPoolExecutor(max_workers=self.detail_workers) as executor:
+            return list(executor.map(fetch, records))
+
+    def iter_browser_pages(self, max_pages, start_page, title, start_time, end_time, area):
+        """
+        浏览器列表页生产者：逐页提取记录并 yield (页码, records)。
+        yield 之后立即翻页，详情抓取在流水线的其他线程中并行进行。
+        """
+        # 1. 导航并搜索
+        self.browser.goto_search_page()
+        self.browser.perform_search(title, start_time, end_time, area)
+        
+        # 2. 如果起始页不是1，跳转
+        if start_page > 1:
+            success = self.browser.jump_to_page(start_page)
+            if not success:
+                self._log(f"跳转到第 {start_page} 页失败，将从当前页开始")
+        
+        # 3. 循环爬取
+        pages_crawled = 0
+        current_page_idx = start_page
+        skipped_pages = 0
+        
+        while pages_crawled < max_pages:
+            self._log(f"--- 正在处理第 {current_page_idx} 页 ---")
             
-            # 2. 如果起始页不是1，跳转
-            if start_page > 1:
-                success = self.browser.jump_to_page(start_page)
-                if not success:
-                    self._log(f"跳转到第 {start_page} 页失败，将从当前页开始")
+            # 提取列表 (无限重试机制：空白数据一定是验证码问题)
+            records = self.browser.extract_records()
             
-            # 3. 循环爬取
-            pages_crawled = 0
-            current_page_idx = start_page
+            rescue_attempts = 0
+            max_rescue_attempts = 10  # 最多重试10次，防止死循环
             
-            while pages_crawled < max_pages:
-                self._log(f"--- 正在处理第 {current_page_idx} 页 ---")
-                
-                # 提取列表 (无限重试机制：空白数据一定是验证码问题)
-                records = self.browser.extract_records()
-                
-                rescue_attempts = 0
-                max_rescue_attempts = 10  # 最多重试10次，防止死循环
+            while not records and rescue_attempts < max_rescue_attempts:
+                rescue_attempts += 1
+                self._log(f"第 {current_page_idx} 页未检测到数据，执行验证码重试 (第 {rescue_attempts} 次)...")
                 
-                while not records and rescue_attempts < max_rescue_attempts:
-                    rescue_attempts += 1
-                    self._log(f"第 {current_page_idx} 页未检测到数据，执行验证码重试 (第 {rescue_attempts} 次)...")
-                    
-                    # 重新执行全量搜索逻辑 (Tab -> 参数 -> 刷新验证码 -> 识别 -> 查询)
-                    self.browser.perform_search(title, start_time, end_time, area)
-                    
-                    # 检查当前页码，只有不在目标页时才跳转
-                    current_page_in_browser = self.browser.get_current_page()
-                    if current_page_in_browser != current_page_idx:
-                        self._log(f"当前页码 {current_page_in_browser}，需要跳转到第 {current_page_idx} 页...")
-                        self.browser.jump_to_page(current_page_idx)
-                    else:
-                        self._log(f"当前已在第 {current_page_idx} 页，无需跳转")
-                    
-                    # 再次尝试提取
-                    records = self.browser.extract_records()
+                # 重新执行全量搜索逻辑 (Tab -> 参数 -> 刷新验证码 -> 识别 -> 查询)
+                self.browser.perform_search(title, start_time, end_time, area)
                 
-                if not records:
-                    self._log(f"已重试 {max_rescue_attempts} 次仍无数据，跳过此页继续下一页")
-                    # 不break，继续尝试下一页
-                    pages_crawled += 1
-                    current_page_idx += 1
-                    if not self.browser.next_page():
-                        self._log("无法点击下一页，停止爬取")
-                        break
-                    continue
-                
-                # 详情页处理 (保持并发)
-                # 注意：BrowserEngine 已经提取了 ID，我们继续用 requests 并发获取详情
-                # 为了保持 session 状态 (Cookies)，我们可以尝试让 requests 使用 browser 的 cookies
-                # 但目前详情页 API 似乎不需要 cookie 或者不敏感？
-                # 如果需要，可以: s = requests.Session(); s.cookies.update(...)
-                
-                if records:
-                    with ThreadPoolExecutor(max_workers=2) as executor:
-                        futures = [executor.submit(self.process_item, rec) for rec in records]
-                        for f in futures:
-                            res = f.result()
-                            if res: all_data.extend(res)
+                # 检查当前页码，只有不在目标页时才跳转
+                current_page_in_browser = self.browser.get_current_page()
+                if current_page_in_browser != current_page_idx:
+                    self._log(f"当前页码 {current_page_in_browser}，需要跳转到第 {current_page_idx} 页...")
+                    self.browser.jump_to_page(current_page_idx)
+                else:
+                    self._log(f"当前已在第 {current_page_idx} 页，无需跳转")
                 
+                # 再次尝试提取
+                records = self.browser.extract_records()
+            
+            if not records:
+                self._log(f"已重试 {max_rescue_attempts} 次仍无数据，跳过此页继续下一页")
+                skipped_pages += 1
+                # 不break，继续尝试下一页
                 pages_crawled += 1
-                if pages_crawled >= max_pages:
-                    break
-                
-                # 翻页
+                current_page_idx += 1
                 if not self.browser.next_page():
                     self._log("无法点击下一页，停止爬取")
                     break
-                    
-                current_page_idx += 1
+                continue
+            
+            # 交给详情阶段 (队列满时在此阻塞，形成背压)
+            yield current_page_idx, records
+            
+            pages_crawled += 1
+            if pages_crawled >= max_pages:
+                break
+            
+            # 翻页
+            if not self.browser.next_page():
+                # 只有没有跳过任何页、且确实翻到最后一页，才算完整爬完
+                if not skipped_pages and self.browser.at_last_page():
+                    self._log("已到最后一页")
+                    self.list_completed = True
+                else:
+                    self._log("无法点击下一页，停止爬取")
+                break
+                
+            current_page_idx += 1
+
+    def iter_network_pages(self, max_pages, start_page, title, start_time, end_time, area, max_rescue_attempts=10):
+        """
+        浏览器翻页 + 网络抓包生产者：页面自己请求 getListByCode，直接从 CDP 读取响应中的记录 (含 id / colCode / oldData)，
+        不再逐行点击标题、切换标签页、解析 URL。未捕获到数据 (验证码 / 超时) 时重新查询。
+        """
+        if not self.browser.network_capture:
+            raise RuntimeError("浏览器未开启网络抓包 (network_capture)，无法使用 network 模式")
+        
+        self.browser.goto_search_page()
+        self.browser.drain_captured_responses()  # 丢弃页面初始化时的默认列表请求
+        self.browser.perform_search(title, start_time, end_time, area)
+        if start_page > 1:
+            self.browser.drain_captured_responses()
+            if not self.browser.jump_to_page(start_page):
+                self._log(f"跳转到第 {start_page} 页失败，将从当前页开始")
+        
+        pages_crawled = 0
+        current_page_idx = start_page
+        rescue_attempts = 0
+        
+        while pages_crawled < max_pages:
+            self._log(f"--- 正在处理第 {current_page_idx} 页 (抓包) ---")
+            captured = self.browser.wait_list_response()
+            records, total_pages = [], LIST_CAPTCHA
+            if captured:
+                request_params, text = captured
+                page_in_request = request_params.get("currentPage")
+                if page_in_request and int(page_in_request) != current_page_idx:
+                    self._log(f"捕获的是第 {page_in_request} 页的响应，与目标页不符")
+                else:
+                    try:
+                        records, total_pages = self.parse_list_response(json.loads(text), text)
+                    except ValueError:
+                        self._log("列表接口响应不是 JSON")
+            
+            if not records:
+                if total_pages not in (LIST_CAPTCHA, LIST_BLOCKED):
+                    self._log(f"第 {current_page_idx} 页无数据，停止爬取")
+                    self.list_completed = True
+                    break
+                rescue_attempts += 1
+                if rescue_attempts > max_rescue_attempts:
+                    self._log(f"已重试 {max_rescue_attempts} 次仍未捕获到列表数据，停止爬取")
+                    break
+                self._log(f"第 {current_page_idx} 页未捕获到列表数据，重新执行查询 (第 {rescue_attempts} 次)...")
+                self.browser.perform_search(title, start_time, end_time, area)
+                if self.browser.get_current_page() != current_page_idx:
+                    self.browser.drain_captured_responses()
+                    self.browser.jump_to_page(current_page_idx)
+                continue
+            
+            rescue_attempts = 0
+            self.browser.pages_served += 1
+            yield current_page_idx, [self.normalize_api_record(rec) for rec in records]
+            
+            pages_crawled += 1
+            if pages_crawled >= max_pages:
+                break
+            if total_pages and current_page_idx >= total_pages:
+                self._log(f"已到最后一页 (共 {total_pages} 页)")
+                self.list_completed = True
+                break
+            if not self.browser.next_page():
+                self._log("无法点击下一页，停止爬取")
+                break
+            current_page_idx += 1
+
+    def lease_browser(self):
+        """取得浏览器：有浏览器池时排队租用，否则新建"""
+        if self.browser is None:
+            if self.browser_pool:
+                self.browser = self.browser_pool.acquire(self.log_func)
+                self._log(f"已租用浏览器 ({self.browser_pool.summary()})")
+            else:
+                from spider.browser_engine import BrowserEngine
+                self.browser = BrowserEngine(headless=False, network_capture=True) # GUI 模式以便通过验证码
+                self.browser.logger = self.log_func # 传递日志函数
+            self.browser.politeness = self.politeness
+            self.browser.wait_report = self.wait_report
+        self.browser.init_driver()
+
+    def return_browser(self):
+        """把浏览器还给浏览器池；没有池时保留浏览器 (Debug 模式)"""
+        if self.browser_pool and self.browser:
+            self.browser_pool.release(self.browser)
+            self.browser = None
+
+    def bootstrap_api_session(self, title, start_time, end_time, area):
+        """
+        用浏览器过一次验证码，再把浏览器的 Cookies / User-Agent 同步到 requests Session，
+        之后列表页直接走 getListByCode 接口。使用浏览器池时同步完即归还浏览器。
+        """
+        self.lease_browser()
+        try:
+            self.browser.goto_search_page()
+            self.browser.perform_search(title, start_time, end_time, area)
+            
+            cookies = self.browser.get_cookies()
+            for c in cookies:
+                self.session.cookies.set(c["name"], c["value"], path=c.get("path", "/"))
+            user_agent = self.browser.get_user_agent()
+            if user_agent:
+                self.session.headers["user-agent"] = user_agent
+            self._log(f"已从浏览器同步 {len(cookies)} 个 Cookie 到 API 会话")
+            self.api_session_ready = True
+        finally:
+            self.return_browser()
+
+    def share_api_session(self, other):
+        """复用另一个爬虫已过验证码的 API 会话 (Cookies / User-Agent)"""
+        self.session.cookies.update(other.session.cookies)
+        self.session.headers["user-agent"] = other.session.headers.get("user-agent")
+        self.api_session_ready = other.api_session_ready
+
+    def probe_list(self, title="", start_time="", end_time="", area="370000"):
+        """
+        请求一次第 1 页，返回 (总页数, 第 1 页原始记录)；无数据时总页数为 0，被拦截或要求验证码时为 None。
+        供日期分片规划按结果量切分时间窗口，第 1 页记录留给分片爬取直接使用，不再重复请求。
+        """
+        api_start, api_end = resolve_time_range(start_time, end_time)
+        records, total_pages = self.get_list(1, title, api_start, api_end, area)
+        if total_pages in (LIST_CAPTCHA, LIST_BLOCKED):
+            return None, []
+        if not records:
+            return 0, []
+        return total_pages or 1, records
+
+    def iter_api_pages(self, max_pages, start_page, title, start_time, end_time, area, max_bootstraps=3,
+                       prefetched=None):
+        """
+        API 列表页生产者：直接分页请求 getListByCode，按返回的 pages 总数结束。
+        接口再次要求验证码时，回退浏览器重新过验证码后继续当前页。
+        prefetched: (原始记录, 总页数)，start_page 已请求过 (如分片规划的探测) 时直接使用，不再重复请求。
+        """
+        api_start, api_end = resolve_time_range(start_time, end_time)
+        pages_crawled = 0
+        current_page_idx = start_page
+        bootstraps = 0
+        
+        while pages_crawled < max_pages:
+            self._log(f"--- 正在处理第 {current_page_idx} 页 (API) ---")
+            if prefetched and current_page_idx == start_page:
+                records, total_pages = prefetched
+                prefetched = None
+            else:
+                records, total_pages = self.get_list(current_page_idx, title, api_start, api_end, area)
+            
+            if total_pages == LIST_CAPTCHA:
+                bootstraps += 1
+                if bootstraps > max_bootstraps:
+                    self._log(f"已回退浏览器 {max_bootstraps} 次仍被要求验证码，停止爬取")
+                    break
+                self._log("API 要求验证码，回退浏览器重新验证...")
+                self.bootstrap_api_session(title, start_time, end_time, area)
+                continue
+            if total_pages == LIST_BLOCKED:
+                break
+            if not records:
+                self._log(f"第 {current_page_idx} 页无数据，停止爬取")
+                self.list_completed = True
+                break
+            
+            yield current_page_idx, [self.normalize_api_record(rec) for rec in records]
+            
+            pages_crawled += 1
+            if total_pages and current_page_idx >= total_pages:
+                self._log(f"已到最后一页 (共 {total_pages} 页)")
+                self.list_completed = True
+                break
+            current_page_idx += 1
+
+    def iter_counted(self, pages, max_pages):
+        """统计列表产出的页数，翻满 max_pages 时置 page_limit_reached (按页数上限正常结束，不是中断)"""
+        listed = 0
+        for page in pages:
+            listed += 1
+            if listed >= max_pages:
+                self.page_limit_reached = True
+            yield page
+
+    def interruption(self):
+        """
+        本次 run() 的中断原因，正常结束返回 None：
+        运行异常 (last_error)，或列表既没翻到最后一页也没翻满页数上限 (被拦截 / 验证码中断)。
+        """
+        if self.last_error:
+            return self.last_error
+        if not (self.list_completed or self.page_limit_reached):
+            return "列表未翻到最后一页 (被拦截或验证码中断)"
+        return None
+
+    def record_rows(self, rows, area):
+        """已写出的行登记到去重索引与本地检索库 (详情抓取失败的公告只登记行，不登记公告)"""
+        if self.dedup_index:
+            self.dedup_index.add_rows(rows, skip_announcements=self.detail_failed)
+        if self.search_store:
+            self.search_store.add_rows(rows, area)
+
+    def iter_new_records(self, pages):
+        """只导出新内容时，详情抓取前先剔除去重索引中已有的公告 (不再请求其详情)"""
+        for page_idx, records in pages:
+            fresh = [rec for rec in records if not self.dedup_index.has_announcement(self.detail_link(rec))]
+            if len(fresh) < len(records):
+                self.dedup_skipped["announcements"] += len(records) - len(fresh)
+                self._log(f"去重索引: 第 {page_idx} 页跳过 {len(records) - len(fresh)} 条已导出过的公告")
+            if fresh:
+                yield page_idx, fresh
+
+    def iter_incremental(self, pages, watermark, state):
+        """
+        增量模式过滤：剔除水位线以下的已抓取记录；
+        某页全部是已抓取记录时停止翻页 (列表按发布时间倒序)。
+        只有确实接上了上次的水位 (出现已抓取的记录)，或列表完整翻到最后一页 (list_completed) 时
+        才置 state["completed"]；被拦截 / 验证码中断 / 达到页数上限 / 有跳过的页都不推进水位线，
+        否则未爬到的记录会被当成"已抓取"。
+        """
+        reached_watermark = False
+        for page_idx, records in pages:
+            fresh = [rec for rec in records if not watermark.is_seen(rec)]
+            if not fresh:
+                # 更早的记录上次都已抓取，列表视为翻完
+                self._log(f"增量模式: 第 {page_idx} 页全部为已抓取记录，停止翻页")
+                state["completed"] = True
+                self.list_completed = True
+                return
+            if len(fresh) < len(records):
+                # 本页已出现水位线以下的记录，更早的记录上次都已抓取
+                reached_watermark = True
+                self._log(f"增量模式: 第 {page_idx} 页跳过 {len(records) - len(fresh)} 条已抓取记录")
+            state["records"].extend(fresh)
+            yield page_idx, fresh
+        state["completed"] = reached_watermark or self.list_completed
+
+    def run(self, max_pages=1, start_page=1, title="", start_time="", end_time="", area="370000",
+            incremental=False, engine="browser", sink=None, checkpoint=None, prefetched=None):
+        """
+        engine: "browser" = Selenium 逐页点击提取列表;
+                "network" = 浏览器翻页，列表记录从页面自身的 getListByCode 响应中抓取 (不逐行点击);
+                "api" = 浏览器只负责过验证码，列表直接请求 getListByCode 接口
+        sink: ExportSink，传入时数据边爬边写盘，返回值为空列表
+        checkpoint: PageCheckpoint，传入时每完成一页就把该页记录和数据行落盘，供中断后续爬
+        prefetched: (原始记录, 总页数)，API 模式下 start_page 已请求过时直接使用 (见 probe_list)
+        """
+        all_data = []
+        self.list_completed = False
+        self.page_limit_reached = False
+        self.last_error = None
+        self.detail_failed = set()
+        
+        try:
+            if self.parse_pool is None and self.parse_processes != 0:
+                self.parse_pool = ParsePool(self.parser, self.parse_processes)
+                self.own_parse_pool = True
+                self._log(f"解析进程池已启动: {self.parse_pool.processes} 个进程")
+            
+            # 列表翻页 / 详情抓取 / 解析 三段并行，浏览器无需等待详情页完成
+            if engine == "api":
+                # API 模式只在过验证码时占用浏览器；会话已就绪 (共享自其他爬虫) 时直接请求接口
+                if not self.api_session_ready:
+                    self.bootstrap_api_session(title, start_time, end_time, area)
+                pages = self.iter_api_pages(max_pages, start_page, title, start_time, end_time, area,
+                                            prefetched=prefetched)
+            elif engine == "network":
+                self.lease_browser()
+                pages = self.iter_network_pages(max_pages, start_page, title, start_time, end_time, area)
+            else:
+                self.lease_browser()
+                pages = self.iter_browser_pages(max_pages, start_page, title, start_time, end_time, area)
+            pages = self.iter_counted(pages, max_pages)
+            
+            watermark = None
+            if incremental and title:
+                self._log("增量模式不支持标题筛选 (水位线按 地区+栏目 记录)，本次按全量爬取")
+            elif incremental and self.watermark_store:
+                watermark = self.watermark_store.load(area, self.colCode)
+                self._log(f"增量模式: 当前水位线 {watermark.max_date or '(无)'}")
+                inc_state = {"records": [], "completed": False}
+                pages = self.iter_incremental(pages, watermark, inc_state)
+            
+            if self.new_only:
+                pages = self.iter_new_records(pages)
+            
+            on_rows = sink.write_rows if sink else None
+            if sink and (self.dedup_index or self.search_store):
+                def on_rows(rows):
+                    # 写出后再登记，写出前中断的行下次仍视为新行
+                    sink.write_rows(rows)
+                    self.record_rows(rows, area)
+            on_page = checkpoint.add_page if checkpoint else None
+            all_data = CrawlPipeline(self, on_rows=on_rows, on_page=on_page).run(pages)
+            
+            if not sink:
+                self.record_rows(all_data, area)
+            if self.new_only:
+                self._log(f"去重索引: 跳过已知公告 {self.dedup_skipped['announcements']} 条、"
+                          f"已知子行 {self.dedup_skipped['rows']} 行 ({self.dedup_index.stats()})")
+            
+            if watermark is not None:
+                if inc_state["completed"]:
+                    failed = [rec for rec in inc_state["records"] if self.detail_link(rec) in self.detail_failed]
+                    if failed:
+                        self._log(f"增量模式: {len(failed)} 条记录详情抓取失败，水位线不越过这些记录，下次重新抓取")
+                    watermark.advance(inc_state["records"], failed)
+                    self.watermark_store.save(area, self.colCode, watermark)
+                    self._log(f"增量模式: 水位线更新为 {watermark.max_date or '(无)'}")
+                else:
+                    self._log("增量模式: 本次爬取未完整结束，水位线保持不变")
+            
+            self.progress["waits"] = self.wait_report.summary()
+            self._log(f"等待统计: {self.wait_report.describe()}")
+            
+            if self.detail_cache:
+                self._log(f"详情缓存统计: 本次任务命中 {self.cache_hits} / 未命中 {self.cache_misses} ({self.detail_cache.stats()})")
                 
         except Exception as e:
+            self.last_error = str(e)
             self._log(f"爬虫运行异常: {e}")
         finally:
-            if self.browser:
+            if self.search_store:
+                self.search_store.flush()
+            if self.own_parse_pool:
+                self.parse_pool.close()
+                self.parse_pool = None
+                self.own_parse_pool = False
+            if self.browser_pool:
+                self.return_browser()
+            elif self.browser:
                 self._log("Debug模式：不自动关闭浏览器，请手动关闭。")
                 # self.browser.close()
                 # self.browser = None
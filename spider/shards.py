@@ -0,0 +1,157 @@
+import datetime
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from spider.multi_region import MergedSink
+
+# 页数未知 (规划时探测失败) 的分片，单次最多翻的页数
+UNKNOWN_SHARD_PAGES = 1000
+
+
+def _parse_date(value):
+    return datetime.date.fromisoformat(value[:10])
+
+
+def plan_shards(start_time, end_time, probe=None, max_pages=20):
+    """
+    把时间窗口切成若干互不重叠的日期分片，按结果量调整分片大小：
+    - probe(start, end) 请求分片的第 1 页，返回 (总页数, 第 1 页记录)；总页数为 None 表示探测失败
+    - 先探测整个窗口，按 总天数 * max_pages / 总页数 估算分片天数，大多数分片一次探测即可定下
+    - 仍超过 max_pages 的分片对半拆分，最小拆到单日；probe 为 None 或探测失败时保留当前大小，页数记为未知
+    返回按时间倒序排列的分片列表 (与网站列表的排序一致)，每个分片为 {"start", "end", "pages", "first_page"}，
+    first_page 为 (第 1 页记录, 总页数)，分片爬取时直接作为第 1 页，探测过的页不再重复请求。
+    """
+    start, end = _parse_date(start_time), _parse_date(end_time)
+    if start > end:
+        start, end = end, start
+
+    def probe_window(first, last):
+        if probe is None:
+            return None, None
+        pages, records = probe(first.isoformat(), last.isoformat())
+        return pages, ((records, pages) if pages is not None else None)
+
+    days = (end - start).days + 1
+    pages, first_page = probe_window(start, end)
+    if pages is not None and pages <= max_pages:
+        return [{"start": start.isoformat(), "end": end.isoformat(), "pages": pages, "first_page": first_page}]
+    # 按整体密度估算分片天数；整体探测失败时退回按周切分
+    shard_days = max(1, days * max_pages // pages) if pages else 7
+
+    pending = []
+    day = start
+    while day <= end:
+        last = min(day + datetime.timedelta(days=shard_days - 1), end)
+        pending.append((day, last))
+        day = last + datetime.timedelta(days=1)
+
+    shards = []
+    while pending:
+        first, last = pending.pop()
+        pages, first_page = probe_window(first, last)
+        if pages is not None and pages > max_pages and first < last:
+            middle = first + (last - first) // 2
+            pending.append((first, middle))
+            pending.append((middle + datetime.timedelta(days=1), last))
+            continue
+        shards.append({"start": first.isoformat(), "end": last.isoformat(), "pages": pages,
+                       "first_page": first_page})
+
+    shards.sort(key=lambda shard: shard["start"], reverse=True)
+    return shards
+
+
+class ShardedCrawl(object):
+    """
+    日期分片并行爬取：每个分片是一次独立的 API 列表爬取 (从第 1 页翻到最后一页)，
+    最多 workers 个分片同时进行，深翻页被限制在单个分片的页数以内。
+    - 分片失败 (运行异常、被拦截 / 验证码中断未翻完) 只重试该分片，其他分片不受影响
+    - 结果经 MergedSink 按子行指纹去重后写入同一个导出文件，重试时已写出的行不会重复
+    - session_source: 已过验证码的爬虫实例，各分片复用其 API 会话，不必每个分片都打开浏览器
+    - 规划时探测到的第 1 页 (shard["first_page"]) 直接交给爬虫，每个分片少请求一页
+    """
+
+    def __init__(self, spider_factory, shards, sink, workers=3, max_retries=2, retry_delay=10.0,
+                 session_source=None, log_func=None):
+        self.spider_factory = spider_factory
+        self.shards = list(shards)
+        self.sink = MergedSink(sink)
+        self.workers = max(1, workers)
+        self.max_retries = max_retries
+        self.retry_delay = retry_delay
+        self.session_source = session_source
+        self.log_func = log_func
+        # 重试后仍有分片失败时为失败汇总 (导出不完整)，全部成功为 None
+        self.last_error = None
+        self.progress = {
+            self._key(shard): {"start": shard["start"], "end": shard["end"], "planned_pages": shard["pages"],
+                               "status": "pending", "attempts": 0,
+                               "pages": 0, "records": 0, "rows": 0, "exported": 0, "duplicates": 0}
+            for shard in self.shards
+        }
+
+    @staticmethod
+    def _key(shard):
+        return f"{shard['start']}~{shard['end']}"
+
+    def _log(self, msg):
+        if self.log_func:
+            self.log_func(msg)
+        else:
+            print(msg)
+
+    def _run_shard(self, shard, crawl_kwargs):
+        key = self._key(shard)
+        state = self.progress[key]
+        max_pages = shard["pages"] or UNKNOWN_SHARD_PAGES
+        for attempt in range(1, self.max_retries + 2):
+            state["status"] = "running"
+            state["attempts"] = attempt
+            state["pages"] = state["records"] = state["rows"] = 0
+            try:
+                spider = self.spider_factory()
+                spider.log_func = lambda msg: self._log(f"[{key}] {msg}")
+                spider.progress = state
+                if self.session_source is not None:
+                    spider.share_api_session(self.session_source)
+                spider.run(max_pages=max_pages, start_page=1, start_time=shard["start"], end_time=shard["end"],
+                           engine="api", sink=self.sink.for_region(state), prefetched=shard.get("first_page"),
+                           **crawl_kwargs)
+                error = spider.last_error or (None if spider.list_completed else "列表未翻到最后一页")
+            except Exception as e:
+                error = str(e)
+            if error is None:
+                state["status"] = "completed"
+                state.pop("error", None)
+                return
+            state["error"] = error
+            if attempt <= self.max_retries:
+                self._log(f"[{key}] 分片失败: {error}，{self.retry_delay * attempt:.0f} 秒后重试 (第 {attempt} 次)")
+                time.sleep(self.retry_delay * attempt)
+        state["status"] = "failed"
+        self._log(f"[{key}] 分片重试 {self.max_retries} 次后仍失败: {state['error']}")
+
+    def run(self, **crawl_kwargs):
+        """crawl_kwargs 透传给 Shandong.run (title / area ...)，时间范围与翻页由分片决定"""
+        known = [shard["pages"] for shard in self.shards if shard["pages"] is not None]
+        self._log(f"日期分片任务: 共 {len(self.shards)} 个分片 (预计 {sum(known)} 页"
+                  + (f"，{len(self.shards) - len(known)} 个分片页数未知" if len(known) < len(self.shards) else "")
+                  + f")，最多 {self.workers} 个并行")
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            for shard in self.shards:
+                executor.submit(self._run_shard, shard, crawl_kwargs)
+        failed = [key for key, state in self.progress.items() if state["status"] == "failed"]
+        self._log(f"日期分片任务结束: 导出 {self.sink.row_count} 行，跨分片重复 {self.sink.duplicates} 行"
+                  + (f"，失败分片: {'、'.join(failed)}" if failed else ""))
+        if failed:
+            self.last_error = f"{len(failed)}/{len(self.shards)} 个分片重试后仍失败，导出不完整: {'、'.join(failed)}"
+        return self.progress
+
+    def summary(self):
+        """汇总进度 (供任务状态持久化)"""
+        totals = {"pages": 0, "records": 0, "rows": 0}
+        for state in self.progress.values():
+            for key in totals:
+                totals[key] += state.get(key, 0)
+        totals["shards"] = {key: dict(state) for key, state in self.progress.items()}
+        return totals
@@ -0,0 +1,44 @@
+import os
+import sqlite3
+import threading
+
+
+def ensure_parent_dir(path):
+    """确保文件所在目录存在"""
+    dirname = os.path.dirname(path)
+    if dirname:
+        os.makedirs(dirname, exist_ok=True)
+
+
+def connect(path, row_factory=None):
+    """打开 WAL 模式的 SQLite 连接 (可跨线程使用，由调用方加锁)，目录不存在时先创建"""
+    ensure_parent_dir(path)
+    conn = sqlite3.connect(path, check_same_thread=False, timeout=30)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    if row_factory:
+        conn.row_factory = row_factory
+    return conn
+
+
+class SQLiteStore(object):
+    """
+    读写分离的 SQLite 存储基类：
+    - 写操作共用一个连接 (self.writer)，调用方持 self.write_lock 串行写入
+    - 读操作每个线程一个连接 (self._reader())；WAL 模式下读取的是一致快照，不会被写入阻塞
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._local = threading.local()
+        self.write_lock = threading.Lock()
+        self.writer = self._connect()
+
+    def _connect(self):
+        return connect(self.path, row_factory=sqlite3.Row)
+
+    def _reader(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = self._local.conn = self._connect()
+        return conn
@@ -0,0 +1,280 @@
+"""
+详情页采购意向表格解析。
+两个后端输出完全一致：
+- bs4:  BeautifulSoup 实现 (原始版本)
+- lxml: 直接基于 lxml.html + 预编译 XPath，每个单元格只取一次文本，适合批量重解析
+"""
+import re
+import threading
+
+import lxml.html
+from bs4 import BeautifulSoup
+from lxml import etree
+
+
+def parse_html_table_bs4(html, log=None):
+    """
+    [V3.1] 终极解析方案：自动纠错与去重 (Fixed)
+    1. 必须包含 '序号' 列才视为有效清单表。
+    2. 使用 recursive=False 并支持 tbody 查找。
+    3. 智能列偏移校正：检测到“序号”列由长文本占据时，自动触发 Left-Shift 修正。
+    4. 全局去重：防止同一项目被多次提取。
+    """
+    if not html:
+        return []
+    soup = BeautifulSoup(html, 'lxml')
+    tables = soup.find_all('table')
+    results = []
+    seen_titles = set()
+
+    if log:
+        log(f"Debug: Found {len(tables)} tables")
+
+    for table_idx, table in enumerate(tables):
+        # 优先查找直接子节点 tr，若无则查找 tbody 下的 tr
+        rows = table.find_all('tr', recursive=False)
+        if len(rows) < 2:
+            tbody = table.find('tbody', recursive=False)
+            if tbody:
+                rows = tbody.find_all('tr', recursive=False)
+
+        if len(rows) < 2:
+            continue
+
+        # 1. 精确寻找表头行
+        header_row_idx = -1
+        col_map = {
+            "sub_index": -1, "project_name": -1, "desc": -1,
+            "amount": -1, "sme_reserve": -1, "est_time": -1, "remark": -1
+        }
+
+        # 搜索前 6 行寻找表头
+        for idx, tr in enumerate(rows[:6]):
+            cells = tr.find_all(['td', 'th'], recursive=False)
+            headers = [c.get_text(strip=True) for c in cells]
+
+            temp_map = {k: -1 for k in col_map}
+            for i, h in enumerate(headers):
+                if "序号" in h: temp_map["sub_index"] = i
+                elif "名称" in h: temp_map["project_name"] = i
+                elif "概况" in h or "需求" in h: temp_map["desc"] = i
+                elif "金额" in h: temp_map["amount"] = i
+                elif "中小企业" in h: temp_map["sme_reserve"] = i
+                elif "时间" in h: temp_map["est_time"] = i
+                elif "备注" in h: temp_map["remark"] = i
+
+            # 严格标准：必须找到“序号”和“项目名称”才视为有效表头
+            if temp_map["sub_index"] != -1 and temp_map["project_name"] != -1:
+                header_row_idx = idx
+                col_map = temp_map
+                break
+
+        if header_row_idx == -1:
+            continue
+
+        # 2. 从表头下一行开始遍历数据
+        for row in rows[header_row_idx+1:]:
+            cols = row.find_all(['td', 'th'], recursive=False)
+            if len(cols) < 2: continue
+
+            def get_clean_text(idx):
+                if idx != -1 and idx < len(cols):
+                    txt = cols[idx].get_text(" ", strip=True) # 使用空格连接标签内容
+                    txt = txt.replace("\n", " ").replace("\r", " ").replace("\t", " ")
+                    while "  " in txt:
+                        txt = txt.replace("  ", " ")
+                    return txt.strip()
+                return ""
+
+            # 提取原始数据
+            raw_idx_val = get_clean_text(col_map["sub_index"])
+            raw_name_val = get_clean_text(col_map["project_name"])
+
+            # 3. 智能错位修正 (Data Shift Correction)
+            is_shifted = False
+            # 如果序号列内容长度超过5且不是纯数字，极有可能是项目名称挤占了序号列
+            if len(raw_idx_val) > 5 and not raw_idx_val.isdigit():
+                is_shifted = True
+
+            item = {}
+            if is_shifted:
+                # 错位处理：物理列重映射
+                # 假定物理顺序列：[Name, Desc, Amount, SME, Time, Remark] (Index丢失)
+                # 强制按物理顺序读取
+                phy_cols = [c.get_text(" ", strip=True).replace("\n","").replace("\r","").strip() for c in cols]
+                # 清洗物理列中的多余空格
+                phy_cols = [" ".join(p.split()) for p in phy_cols]
+                while len(phy_cols) < 7: phy_cols.append("")
+
+                item = {
+                    "子序号": "",
+                    "采购项目名称": phy_cols[0],
+                    "采购需求概况": phy_cols[1],
+                    "预算金额(万元)": phy_cols[2],
+                    "拟面向中小企业预留": phy_cols[3],
+                    "预计采购时间": phy_cols[4],
+                    "备注": phy_cols[5] if len(phy_cols)>5 else ""
+                }
+            else:
+                # 正常映射
+                item = {
+                    "子序号": raw_idx_val,
+                    "采购项目名称": raw_name_val,
+                    "采购需求概况": get_clean_text(col_map["desc"]),
+                    "预算金额(万元)": get_clean_text(col_map["amount"]),
+                    "拟面向中小企业预留": get_clean_text(col_map["sme_reserve"]),
+                    "预计采购时间": get_clean_text(col_map["est_time"]),
+                    "备注": get_clean_text(col_map["remark"])
+                }
+
+            # 4. 有效性校验
+            if not item["采购项目名称"] or item["采购项目名称"] in ["采购项目名称", "项目名称", "名称"]:
+                continue
+
+            # 5. 全局去重 (使用 项目名称+金额 作为指纹)
+            unique_key = item["采购项目名称"] + item["预算金额(万元)"]
+            if unique_key in seen_titles:
+                continue
+            seen_titles.add(unique_key)
+
+            results.append(item)
+
+    return results
+
+
+# 与 bs4 get_text 保持一致：不取注释，以及 script/style/template/rt/rp 内的文本
+_CELL_STRINGS = etree.XPath(
+    ".//text()[not(ancestor::script or ancestor::style or ancestor::template or ancestor::rt or ancestor::rp)]",
+    smart_strings=False
+)
+_ROW_CELLS = etree.XPath("td|th")
+_DIRECT_ROWS = etree.XPath("tr")
+_CONTROL_WS = str.maketrans({"\n": " ", "\r": " ", "\t": " "})
+_MULTI_SPACE = re.compile(" {2,}")
+_HEADER_NAMES = ("采购项目名称", "项目名称", "名称")
+# lxml 解析器实例不能跨线程共用，每个线程一个
+_local = threading.local()
+
+
+def _parse_document(html):
+    # 统一按 UTF-8 字节解析：带 <?xml encoding=...?> 声明的 str 不能直接交给 lxml，
+    # 而 <meta charset=gbk> 之类的声明也不应覆盖已解码好的文本
+    parser = getattr(_local, "parser", None)
+    if parser is None:
+        parser = _local.parser = lxml.html.HTMLParser(encoding="utf-8")
+    return lxml.html.document_fromstring(html.encode("utf-8"), parser=parser)
+
+
+def _cell_strings(cell):
+    """单元格内各文本片段 (已 strip、去空)，等价于 bs4 的 stripped_strings"""
+    return [s for s in (t.strip() for t in _CELL_STRINGS(cell)) if s]
+
+
+def _clean(parts):
+    # 等价于 get_clean_text: 空格连接 -> 控制字符转空格 -> 合并连续空格
+    return _MULTI_SPACE.sub(" ", " ".join(parts).translate(_CONTROL_WS)).strip()
+
+
+def _header_map(header_texts):
+    col_map = {
+        "sub_index": -1, "project_name": -1, "desc": -1,
+        "amount": -1, "sme_reserve": -1, "est_time": -1, "remark": -1
+    }
+    for i, h in enumerate(header_texts):
+        if "序号" in h: col_map["sub_index"] = i
+        elif "名称" in h: col_map["project_name"] = i
+        elif "概况" in h or "需求" in h: col_map["desc"] = i
+        elif "金额" in h: col_map["amount"] = i
+        elif "中小企业" in h: col_map["sme_reserve"] = i
+        elif "时间" in h: col_map["est_time"] = i
+        elif "备注" in h: col_map["remark"] = i
+    return col_map
+
+
+def parse_html_table_lxml(html, log=None):
+    """parse_html_table_bs4 的 lxml 实现，输出逐字段一致"""
+    if not html:
+        return []
+    try:
+        doc = _parse_document(html)
+    except etree.ParserError:
+        if log:
+            log("Debug: Found 0 tables")
+        return []
+    tables = list(doc.iter("table"))
+    results = []
+    seen_titles = set()
+
+    if log:
+        log(f"Debug: Found {len(tables)} tables")
+
+    for table in tables:
+        rows = _DIRECT_ROWS(table)
+        if len(rows) < 2:
+            tbody = table.find("tbody")
+            if tbody is not None:
+                rows = _DIRECT_ROWS(tbody)
+        if len(rows) < 2:
+            continue
+
+        header_row_idx = -1
+        for idx, tr in enumerate(rows[:6]):
+            col_map = _header_map(["".join(_cell_strings(c)) for c in _ROW_CELLS(tr)])
+            if col_map["sub_index"] != -1 and col_map["project_name"] != -1:
+                header_row_idx = idx
+                break
+        if header_row_idx == -1:
+            continue
+
+        for row in rows[header_row_idx + 1:]:
+            cells = _ROW_CELLS(row)
+            if len(cells) < 2:
+                continue
+            parts = [_cell_strings(c) for c in cells]
+
+            def text(idx):
+                return _clean(parts[idx]) if idx != -1 and idx < len(parts) else ""
+
+            raw_idx_val = text(col_map["sub_index"])
+            if len(raw_idx_val) > 5 and not raw_idx_val.isdigit():
+                # 错位修正：按物理列顺序读取 (注意这里换行是删除而不是转空格，与原实现一致)
+                phy_cols = [
+                    " ".join(" ".join(p).replace("\n", "").replace("\r", "").split()) for p in parts
+                ]
+                while len(phy_cols) < 7:
+                    phy_cols.append("")
+                item = {
+                    "子序号": "",
+                    "采购项目名称": phy_cols[0],
+                    "采购需求概况": phy_cols[1],
+                    "预算金额(万元)": phy_cols[2],
+                    "拟面向中小企业预留": phy_cols[3],
+                    "预计采购时间": phy_cols[4],
+                    "备注": phy_cols[5]
+                }
+            else:
+                item = {
+                    "子序号": raw_idx_val,
+                    "采购项目名称": text(col_map["project_name"]),
+                    "采购需求概况": text(col_map["desc"]),
+                    "预算金额(万元)": text(col_map["amount"]),
+                    "拟面向中小企业预留": text(col_map["sme_reserve"]),
+                    "预计采购时间": text(col_map["est_time"]),
+                    "备注": text(col_map["remark"])
+                }
+
+            if not item["采购项目名称"] or item["采购项目名称"] in _HEADER_NAMES:
+                continue
+            unique_key = item["采购项目名称"] + item["预算金额(万元)"]
+            if unique_key in seen_titles:
+                continue
+            seen_titles.add(unique_key)
+            results.append(item)
+
+    return results
+
+
+PARSERS = {
+    "bs4": parse_html_table_bs4,
+    "lxml": parse_html_table_lxml,
+}
@@ -0,0 +1,83 @@
+import collections
+import random
+import threading
+import time
+from urllib.parse import urlparse
+
+# 默认礼貌延迟区间 (秒)：同一主机两次操作的起点之间至少间隔 uniform(min, max)
+DEFAULT_DELAYS = {
+    # 浏览器页面操作 (点击筛选、查询、翻页、打开详情)
+    "www.ccgp-shandong.gov.cn": (1.0, 2.0),
+    # 列表 / 详情接口；原先每个线程各自休眠 2-5 秒，2 个详情线程合计约每 1.75 秒一个请求
+    "www.ccgp-shandong.gov.cn:8087": (1.0, 2.5),
+}
+
+
+def host_of(url):
+    return urlparse(url).netloc
+
+
+class PolitenessScheduler(object):
+    """
+    按主机统一调度的礼貌延迟 (防封)，代替散落在各处的固定 sleep。
+    - 间隔从上一次操作的起点算起，等待页面加载等已耗掉的时间计入间隔，只补足剩余部分
+    - 多个线程 / 任务共享同一个调度器时，同一主机的总请求速率受同一预算约束
+    """
+
+    def __init__(self, delays=None, default=(1.0, 2.0)):
+        self.delays = dict(DEFAULT_DELAYS)
+        if delays:
+            self.delays.update(delays)
+        self.default = default
+        self.next_at = {}
+        self.lock = threading.Lock()
+
+    def set_delay(self, host, min_delay, max_delay):
+        with self.lock:
+            self.delays[host] = (min_delay, max_delay)
+
+    def reserve(self, host):
+        """预订该主机的下一个操作时间，返回需要等待的秒数"""
+        with self.lock:
+            low, high = self.delays.get(host, self.default)
+            now = time.monotonic()
+            start = max(now, self.next_at.get(host, 0.0))
+            self.next_at[host] = start + random.uniform(low, high)
+            return start - now
+
+    def wait(self, host, report=None):
+        delay = self.reserve(host)
+        if delay > 0:
+            time.sleep(delay)
+        if report is not None:
+            report.add("politeness", max(delay, 0.0))
+        return delay
+
+
+class WaitReport(object):
+    """
+    单个任务的等待耗时统计，区分:
+    - page: 等待页面就绪 (WebDriverWait 条件、列表接口响应)
+    - politeness: 礼貌延迟 (PolitenessScheduler)
+    """
+
+    def __init__(self):
+        self.totals = collections.Counter()
+        self.counts = collections.Counter()
+        self.lock = threading.Lock()
+
+    def add(self, kind, seconds):
+        with self.lock:
+            self.totals[kind] += seconds
+            self.counts[kind] += 1
+
+    def summary(self):
+        with self.lock:
+            return {kind: {"seconds": round(self.totals[kind], 2), "count": self.counts[kind]} for kind in self.totals}
+
+    def describe(self):
+        s = self.summary()
+        page = s.get("page", {"seconds": 0, "count": 0})
+        polite = s.get("politeness", {"seconds": 0, "count": 0})
+        return (f"等待页面 {page['seconds']}s ({page['count']} 次) / "
+                f"礼貌延迟 {polite['seconds']}s ({polite['count']} 次)")
@@ -0,0 +1,83 @@
+import json
+import threading
+import time
+
+from spider.storage import connect
+
+
+def _record_date(record):
+    # 浏览器列表为 YYYY-MM-DD，接口可能带时分秒，统一截取到日期
+    return (record.get("date") or "").strip()[:10]
+
+
+class Watermark(object):
+    """
+    单个 (area, colCode) 的水位线：已见过的最新发布日期，以及该日期下已见过的记录 id。
+    列表按发布时间倒序，早于水位日期的记录一定已抓过；同一天的记录再按 id 判断。
+    """
+
+    def __init__(self, max_date="", ids=None):
+        self.max_date = max_date
+        self.ids = set(ids or [])
+
+    def is_seen(self, record):
+        date = _record_date(record)
+        if not self.max_date or not date:
+            return False
+        if date < self.max_date:
+            return True
+        return date == self.max_date and str(record.get("id")) in self.ids
+
+    def advance(self, records, failed=()):
+        """
+        用本次抓到的记录推进水位。
+        failed: 详情抓取失败 (只导出了兜底行) 的记录，不计入水位，且水位不越过其中最早的发布日期，
+        下次增量爬取仍会重新抓取这些记录。
+        """
+        failed_ids = {str(rec.get("id")) for rec in failed}
+        limit = min((_record_date(rec) for rec in failed if _record_date(rec)), default="")
+        for rec in records:
+            date = _record_date(rec)
+            if not date or str(rec.get("id")) in failed_ids or (limit and date > limit):
+                continue
+            if date > self.max_date:
+                self.max_date = date
+                self.ids = set()
+            if date == self.max_date:
+                self.ids.add(str(rec.get("id")))
+
+
+class WatermarkStore(object):
+    """增量爬取水位线的 SQLite 存储，按 (area, colCode) 区分"""
+
+    def __init__(self, path="cache/crawl_state.sqlite3"):
+        self.lock = threading.Lock()
+        self.conn = connect(path)
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS watermark (
+                area TEXT NOT NULL,
+                col_code TEXT NOT NULL,
+                max_date TEXT NOT NULL,
+                ids TEXT NOT NULL,
+                updated_at REAL NOT NULL,
+                PRIMARY KEY (area, col_code)
+            )
+        """)
+        self.conn.commit()
+
+    def load(self, area, col_code):
+        with self.lock:
+            row = self.conn.execute(
+                "SELECT max_date, ids FROM watermark WHERE area=? AND col_code=?", (area, col_code)
+            ).fetchone()
+        if not row:
+            return Watermark()
+        return Watermark(row[0], json.loads(row[1]))
+
+    def save(self, area, col_code, watermark):
+        with self.lock:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO watermark VALUES (?, ?, ?, ?, ?)",
+                (area, col_code, watermark.max_date, json.dumps(sorted(watermark.ids)), time.time())
+            )
+            self.conn.commit()
@@ -0,0 +1,92 @@
+import collections
+import itertools
+import threading
+import time
+
+LEVELS = ("debug", "info", "warning", "error")
+
+# 按消息内容推断级别/阶段 (爬虫侧只传字符串)
+_DEBUG_PREFIXES = ("Debug", "下一页按钮状态", "跳转前输入框值", "跳转后输入框值")
+_ERROR_MARKS = ("❌", "Error", "异常", "出错")
+_WARNING_MARKS = ("🔥", "⚠️", "失败", "超时", "警告")
+_STAGE_RULES = (
+    ("[Browser]", "browser"),
+    ("详情", "detail"),
+    ("解析", "detail"),
+    ("列表", "list"),
+    ("页 ---", "list"),
+    ("缓存", "cache"),
+    ("增量", "incremental"),
+)
+
+
+def classify(msg):
+    """返回 (level, stage)"""
+    # 去掉开头的 [地区] / [Browser] 等标签再判断调试前缀
+    body = msg
+    while body.startswith("[") and "] " in body:
+        body = body.split("] ", 1)[1]
+    if body.startswith(_DEBUG_PREFIXES):
+        level = "debug"
+    elif any(mark in msg for mark in _ERROR_MARKS):
+        level = "error"
+    elif any(mark in msg for mark in _WARNING_MARKS):
+        level = "warning"
+    else:
+        level = "info"
+    stage = "task"
+    for mark, name in _STAGE_RULES:
+        if mark in msg:
+            stage = name
+            break
+    return level, stage
+
+
+class TaskLog(object):
+    """
+    单个任务的日志环形缓冲区。
+    - 固定容量 deque，追加与淘汰均为 O(1)
+    - 每条日志为结构化事件: seq (从 1 递增), ts, level, stage, msg
+    - sample 按级别采样: 0 = 丢弃, 1 = 全部保留, N = 每 N 条保留 1 条；被丢弃的条数计入 suppressed
+    """
+
+    def __init__(self, capacity=1000, sample=None):
+        self.events = collections.deque(maxlen=capacity)
+        self.seq = 0
+        self.sample = {"debug": 20}
+        if sample:
+            self.sample.update(sample)
+        self.level_counts = collections.Counter()
+        self.suppressed = collections.Counter()
+        self.lock = threading.Lock()
+
+    def append(self, msg, level=None, stage=None):
+        """写入一条日志，被采样丢弃时返回 None"""
+        auto_level, auto_stage = classify(msg)
+        level = level or auto_level
+        stage = stage or auto_stage
+        with self.lock:
+            self.level_counts[level] += 1
+            rate = self.sample.get(level, 1)
+            if rate != 1 and (rate <= 0 or self.level_counts[level] % rate != 1):
+                self.suppressed[level] += 1
+                return None
+            self.seq += 1
+            event = {"seq": self.seq, "ts": time.time(), "level": level, "stage": stage, "msg": msg}
+            self.events.append(event)
+            return event
+
+    def since(self, seq):
+        """返回序号大于 seq 的事件 (只遍历新增部分)"""
+        with self.lock:
+            count = min(len(self.events), max(0, self.seq - seq))
+            tail = list(itertools.islice(reversed(self.events), count))
+        tail.reverse()
+        return tail
+
+    def lines(self):
+        with self.lock:
+            return [e["msg"] for e in self.events]
+
+    def stats(self):
+        return {"total": dict(self.level_counts), "suppressed": dict(self.suppressed)}
@@ -0,0 +1,109 @@
+import json
+import time
+
+from spider.storage import SQLiteStore
+
+
+class TaskStore(SQLiteStore):
+    """
+    持久化任务登记表 (SQLite WAL)，服务重启后仍可查询历史任务、日志与下载结果文件。
+    写操作共用一个连接并加锁，保证后台爬虫线程之间互不干扰；读操作每个线程一个连接。
+    """
+
+    def __init__(self, path="cache/tasks.sqlite3"):
+        super().__init__(path)
+        self.writer.executescript("""
+            CREATE TABLE IF NOT EXISTS tasks (
+                task_id TEXT PRIMARY KEY,
+                status TEXT NOT NULL,
+                params TEXT NOT NULL,
+                progress TEXT NOT NULL DEFAULT '{}',
+                file TEXT,
+                error TEXT,
+                created_at REAL NOT NULL,
+                updated_at REAL NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS idx_tasks_created ON tasks(created_at);
+            CREATE TABLE IF NOT EXISTS task_logs (
+                task_id TEXT NOT NULL,
+                seq INTEGER NOT NULL,
+                ts REAL NOT NULL,
+                level TEXT NOT NULL,
+                stage TEXT NOT NULL,
+                msg TEXT NOT NULL,
+                PRIMARY KEY (task_id, seq)
+            );
+        """)
+        self.writer.commit()
+
+    # ---- 写 ----
+
+    def create(self, task_id, params, status="running"):
+        now = time.time()
+        with self.write_lock:
+            self.writer.execute(
+                "INSERT INTO tasks (task_id, status, params, created_at, updated_at) VALUES (?, ?, ?, ?, ?)",
+                (task_id, status, json.dumps(params, ensure_ascii=False), now, now)
+            )
+            self.writer.commit()
+
+    def update(self, task_id, status=None, file=None, error=None, progress=None):
+        fields = {"updated_at": time.time()}
+        if status is not None:
+            fields["status"] = status
+        if file is not None:
+            fields["file"] = file
+        if error is not None:
+            fields["error"] = error
+        if progress is not None:
+            fields["progress"] = json.dumps(progress, ensure_ascii=False)
+        sets = ", ".join(f"{k}=?" for k in fields)
+        with self.write_lock:
+            self.writer.execute(f"UPDATE tasks SET {sets} WHERE task_id=?", list(fields.values()) + [task_id])
+            self.writer.commit()
+
+    def append_logs(self, task_id, events):
+        if not events:
+            return
+        with self.write_lock:
+            self.writer.executemany(
+                "INSERT OR IGNORE INTO task_logs VALUES (?, ?, ?, ?, ?, ?)",
+                [(task_id, e["seq"], e["ts"], e["level"], e["stage"], e["msg"]) for e in events]
+            )
+            self.writer.commit()
+
+    def mark_interrupted(self):
+        """服务启动时调用：上次进程退出时仍在运行的任务标记为 interrupted"""
+        with self.write_lock:
+            cur = self.writer.execute(
+                "UPDATE tasks SET status='interrupted', updated_at=? WHERE status='running'", (time.time(),)
+            )
+            self.writer.commit()
+            return cur.rowcount
+
+    # ---- 读 ----
+
+    @staticmethod
+    def _row_to_dict(row):
+        task = dict(row)
+        task["params"] = json.loads(task["params"])
+        task["progress"] = json.loads(task["progress"])
+        return task
+
+    def get(self, task_id):
+        row = self._reader().execute("SELECT * FROM tasks WHERE task_id=?", (task_id,)).fetchone()
+        return self._row_to_dict(row) if row else None
+
+    def list(self, limit=50):
+        rows = self._reader().execute(
+            "SELECT * FROM tasks ORDER BY created_at DESC LIMIT ?", (limit,)
+        ).fetchall()
+        return [self._row_to_dict(r) for r in rows]
+
+    def logs(self, task_id, since=0, limit=1000):
+        """返回序号大于 since 的最近 limit 条日志事件"""
+        rows = self._reader().execute(
+            "SELECT seq, ts, level, stage, msg FROM task_logs WHERE task_id=? AND seq>? "
+            "ORDER BY seq DESC LIMIT ?", (task_id, since, limit)
+        ).fetchall()
+        return [dict(r) for r in reversed(rows)]
@@ -0,0 +1,101 @@
+from spider.multi_region import MergedSink
+from spider.shards import ShardedCrawl
+
+LINK = "http://www.ccgp-shandong.gov.cn/detail?id=1&colCode=2500&oldData=0"
+
+
+class ListSink(object):
+    def __init__(self):
+        self.rows = []
+        self.path = "memory"
+
+    def write_rows(self, rows):
+        self.rows.extend(rows)
+
+    @property
+    def row_count(self):
+        return len(self.rows)
+
+    def close(self):
+        pass
+
+
+def announcement_rows():
+    # 同一公告解析出的 5 个不同子行：错位修正的行子序号为空，第二张表从 1 重新编号
+    return [
+        {"Link": LINK, "子序号": "1", "采购项目名称": "办公设备", "预算金额(万元)": "12"},
+        {"Link": LINK, "子序号": "2", "采购项目名称": "空调", "预算金额(万元)": "30"},
+        {"Link": LINK, "子序号": "", "采购项目名称": "网络改造", "预算金额(万元)": "45"},
+        {"Link": LINK, "子序号": "", "采购项目名称": "安防监控", "预算金额(万元)": "60"},
+        {"Link": LINK, "子序号": "1", "采购项目名称": "物业服务", "预算金额(万元)": "80"},
+    ]
+
+
+def test_distinct_child_rows_are_all_written():
+    sink = ListSink()
+    merged = MergedSink(sink)
+    merged.write_rows(announcement_rows())
+    assert sink.row_count == 5
+    assert merged.duplicates == 0
+
+
+def test_same_rows_from_another_region_are_dropped():
+    sink = ListSink()
+    merged = MergedSink(sink)
+    counts = []
+    merged.write_rows(announcement_rows())
+    # 排版差异 (空白、千分位外的等价金额写法) 仍视为同一行
+    again = [dict(row, 采购项目名称=" " + row["采购项目名称"] + " ") for row in announcement_rows()]
+    again[0]["预算金额(万元)"] = "12.0"
+    merged.write_rows(again, lambda written, duplicates: counts.append((written, duplicates)))
+    assert sink.row_count == 5
+    assert counts == [(0, 5)]
+
+
+class FlakySpider(object):
+    """第一次运行写出部分行后中断，第二次完整写出"""
+    attempts = 0
+
+    def __init__(self):
+        self.log_func = None
+        self.progress = {}
+        self.last_error = None
+        self.list_completed = False
+
+    def run(self, sink, **kwargs):
+        FlakySpider.attempts += 1
+        rows = announcement_rows()
+        if FlakySpider.attempts == 1:
+            sink.write_rows(rows[:3])
+            return
+        sink.write_rows(rows)
+        self.list_completed = True
+
+
+def test_shard_retry_keeps_every_row_once():
+    sink = ListSink()
+    shards = [{"start": "2025-03-01", "end": "2025-03-07", "pages": 1}]
+    job = ShardedCrawl(FlakySpider, shards, sink, retry_delay=0, log_func=lambda msg: None)
+    job.run()
+    state = job.progress["2025-03-01~2025-03-07"]
+    assert state["status"] == "completed"
+    assert state["attempts"] == 2
+    assert sink.row_count == 5
+    assert job.sink.duplicates == 3
+
+
+class BlockedSpider(FlakySpider):
+    """每次都在翻完列表前被拦截"""
+
+    def run(self, sink, **kwargs):
+        sink.write_rows(announcement_rows()[:2])
+
+
+def test_failed_shard_sets_last_error():
+    sink = ListSink()
+    shards = [{"start": "2025-03-01", "end": "2025-03-07", "pages": 1}]
+    job = ShardedCrawl(BlockedSpider, shards, sink, max_retries=1, retry_delay=0, log_func=lambda msg: None)
+    job.run()
+    assert job.progress["2025-03-01~2025-03-07"]["status"] == "failed"
+    assert "2025-03-01~2025-03-07" in job.last_error
+    assert sink.row_count == 2